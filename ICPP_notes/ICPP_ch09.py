@@ -4,6 +4,7 @@ ICPP Chapter 9
 A Simplistic Introduction to Algorithmic Complexity
 @author: Daniel J. Vera, Ph.D.
 """
+import subsets
 #%% Thinking About Computational Complexity ================================
 # How long will the following function take to run?
 def f(i):
@@ -232,6 +233,24 @@ def gen_powerset(L):
 #              'u','v','w','x','y','z'])
 # exponential in len(L)
 
+# Still exponential in time, but a generator need not hold all 2**n
+# subsets at once: subsets.gen_subsets yields them one at a time, in
+# Gray code order (each differs from the last by one element).
+def count_subsets(L):
+    """Assumes L is a list
+       Returns the number of subsets of L, counted one at a time"""
+    count = 0
+    for subset in subsets.gen_subsets(L):
+        count += 1
+    return count
+
+#count_subsets(['a','b','c','d','e','f','g','h','i','j',
+#               'k','l','m','n','o','p','q','r','s','t'])
+
+# get_binary_rep is only used to test whether bit j of i is 1, which
+# i >> j & 1 does directly; subsets.gen_powerset_masks(L) builds the
+# same subsets that way, with no strings.
+
 # Comparison of Complexity Classes
 # This section in the text provides plots to examine algorithms
 # in various complexity classes.
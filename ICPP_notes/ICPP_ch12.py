@@ -4,6 +4,9 @@ ICPP Chapter 12
 Knapsack and Graph Optimization Problems
 @author: Daniel J. Vera, Ph.D.
 """
+import random
+import knapsack_engine
+import subsets
 #%% Knapsack Problems ======================================================
 # Greedy Algorithms
 class Item(object):
@@ -74,6 +77,43 @@ def test_greedys(max_weight = 20):
     print('\nUse greedy by density to fill knapsack of size', max_weight)
     test_greedy(items, max_weight, density)
 
+# greedy sorts the items again with a Python key_function on every call.
+# knapsack_engine.GreedyKnapsack computes the three keys once as arrays,
+# and sorts by each key at most once.
+def greedy_engine(items):
+    return knapsack_engine.GreedyKnapsack(
+        [item.get_value() for item in items],
+        [item.get_weight() for item in items])
+
+def greedy_fast(items, max_weight, key_function, engine = None):
+    """Same as greedy, for key_function value, weight_inverse or
+       density; engine, if given, is greedy_engine(items)"""
+    if engine is None:
+        engine = greedy_engine(items)
+    taken, total_value = engine.select(max_weight, key_function.__name__)
+    return ([items[i] for i in taken], total_value)
+
+def test_greedys_fast(max_weight = 20, items = None):
+    if items is None:
+        items = build_items()
+    engine = greedy_engine(items)
+    for key_function in (value, weight_inverse, density):
+        taken, val = greedy_fast(items, max_weight, key_function, engine)
+        print('Use greedy by', key_function.__name__,
+              'to fill knapsack of size', max_weight)
+        print('Total value of items taken is', val)
+
+def greedy_curves(items, capacities):
+    """Returns a dict mapping each key name to an array of the value
+       greedy takes for each capacity in capacities"""
+    engine = greedy_engine(items)
+    return {key: engine.curve(capacities, key)
+            for key in knapsack_engine.GreedyKnapsack.KEYS}
+
+# e.g., with a million items:
+# items = build_random_items(1000000)
+# greedy_curves(items, range(0, 10001, 100))
+
 #%% An Optimal Solution to the 0/1 Knapsack Problem
 # First recall the gen_power_set function from chapter 9 of text.
 def gen_powerset(L):
@@ -121,15 +161,74 @@ def choose_best(pset, max_weight, get_val, get_weight):
             best_set = items
     return (best_set, best_val)
 
-def test_best(max_weight = 20):
-    items = build_items()
-    pset = gen_powerset(items)
-    taken, val = choose_best(pset, max_weight, Item.get_value,
-                            Item.get_weight)
+def choose_best_gray(items, max_weight, get_val, get_weight):
+    """Same result as choose_best(gen_powerset(items), ...), up to ties,
+       but visits the subsets in Gray code order, so each subset's
+       totals come from the last one's by adding or removing one item,
+       and no powerset is built"""
+    vals = [get_val(item) for item in items]
+    weights = [get_weight(item) for item in items]
+    best_val = 0.0
+    best_mask = None
+    for mask, items_val, items_weight in subsets.gray_code_sums(vals,
+                                                                weights):
+        if items_weight <= max_weight and items_val > best_val:
+            best_val = items_val
+            best_mask = mask
+    if best_mask is None:
+        return (None, best_val)
+    return ([items[j] for j in subsets.mask_to_indices(best_mask)],
+            best_val)
+
+def choose_best_blocks(items, max_weight, get_val, get_weight):
+    """Same result as choose_best_gray, but the subsets are uint64
+       bitmasks, summed a block of about a million at a time with
+       NumPy; for at most 64 items"""
+    val, mask = subsets.choose_best_masks(
+        [get_val(item) for item in items],
+        [get_weight(item) for item in items], max_weight)
+    if val == 0:
+        return (None, 0.0)
+    return ([items[j] for j in subsets.mask_to_indices(mask)], val)
+
+def choose_best_mitm(items, max_weight, get_val, get_weight):
+    """Same result as choose_best_gray, from a meet-in-the-middle search
+       of the two halves of items, which is exact for 40 or so items"""
+    val, taken = subsets.meet_in_the_middle_knapsack(
+        [get_val(item) for item in items],
+        [get_weight(item) for item in items], max_weight)
+    if val == 0:
+        return (None, 0.0)
+    return ([items[j] for j in taken], val)
+
+def test_best(max_weight = 20, items = None, method = 'powerset'):
+    """method is 'powerset' (the original), 'gray', 'blocks' or 'mitm'"""
+    if items is None:
+        items = build_items()
+    if method == 'powerset':
+        pset = gen_powerset(items)
+        taken, val = choose_best(pset, max_weight, Item.get_value,
+                                Item.get_weight)
+    elif method == 'gray':
+        taken, val = choose_best_gray(items, max_weight, Item.get_value,
+                                      Item.get_weight)
+    elif method == 'blocks':
+        taken, val = choose_best_blocks(items, max_weight, Item.get_value,
+                                        Item.get_weight)
+    else:
+        taken, val = choose_best_mitm(items, max_weight, Item.get_value,
+                                      Item.get_weight)
     print('Total value of items taken is', val)
     for item in taken:
         print(item)
 
+def build_random_items(num_items, max_val = 100, max_weight = 20):
+    return [Item(str(i), random.randint(1, max_val),
+                 random.randint(1, max_weight)) for i in range(num_items)]
+
+# test_best(100, build_random_items(40), 'mitm') takes under a second;
+# the powerset of 40 items would not fit in memory
+
 #%% Graph Optimization Problems ============================================
 class Node(object):
     def __init__(self, name):
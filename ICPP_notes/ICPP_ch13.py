@@ -5,6 +5,7 @@ Dynamic Programming
 @author: Daniel J. Vera, Ph.D.
 """
 import random
+import knapsack_engine
 #%% Fibonacci Sequences, Revisited =========================================
 def fib(n):
     """Assumes n is an int >= 0
@@ -146,27 +147,32 @@ for item in taken:
 print('Total value of items taken =', val) 
 
 #%%
-def fast_max_val(to_consider, avail, memo = {}):
+def memo_max_val(to_consider, avail, memo = None):
     """Assumes to_consider a list of items, avail a weight,
        memo supplied by recursive calls
        Returns a tuple of the total value of a solution to the
        0/1 knapsack problem and the items of that solution."""
+    # The textbook's memo = {} default is shared by every call, so a
+    # second knapsack would reuse answers keyed only by
+    # (len(to_consider), avail) from the first.
+    if memo is None:
+        memo = {}
     if (len(to_consider), avail) in memo:
         result = memo[(len(to_consider), avail)]
     elif to_consider == [] or avail == 0:
         result = (0, ())
     elif to_consider[0].get_weight() > avail:
         # Explore right branch only
-        result = fast_max_val(to_consider[1:], avail, memo)
+        result = memo_max_val(to_consider[1:], avail, memo)
     else:
         next_item = to_consider[0]
         # Explore left branch
         with_val, with_to_take =\
-                  fast_max_val(to_consider[1:],
+                  memo_max_val(to_consider[1:],
                                avail - next_item.get_weight(), memo)
         with_val += next_item.get_value()
         # Exloire right branch
-        without_val, without_to_take = fast_max_val(to_consider[1:],
+        without_val, without_to_take = memo_max_val(to_consider[1:],
                                                     avail, memo)
         # Choose better branch
         if with_val > without_val:
@@ -175,17 +181,38 @@ def fast_max_val(to_consider, avail, memo = {}):
             result = (without_val, without_to_take)
     memo[(len(to_consider), avail)] = result
     return result
+
+# memo_max_val still copies to_consider at every call and recurses once
+# per item, so it hits the recursion limit at a few thousand items.
+# fast_max_val fills the same table bottom up with no recursion.
+def fast_max_val(to_consider, avail, vals = None, weights = None):
+    """Assumes to_consider a list of items, avail a weight (an int);
+       or, as in max_val2, to_consider a list of names with their
+       values in vals and int weights in weights
+       Returns a tuple of the total value of a solution to the
+       0/1 knapsack problem and the items of that solution."""
+    if vals is None:
+        vals, weights = knapsack_engine.item_arrays(to_consider)
+    val, taken = knapsack_engine.dp_knapsack(vals, weights, avail)
+    return val, tuple(to_consider[i] for i in taken)
                   
-def big_test_v2(num_items):
+def big_test_v2(num_items, avail = 1000, verbose = True):
     items = build_many_items(num_items, 10, 10)
-    val, taken = fast_max_val(items, 1000) # original was 
-    print('Items Taken')
-    for item in taken:
-        print(item)
+    val, taken = fast_max_val(items, avail) # original was 
+    if verbose:
+        print('Items Taken')
+        for item in taken:
+            print(item)
     print('Total value of items taken =', val)
 
 big_test_v2(40)
 big_test_v2(256)
+#%% 100,000 items and a capacity of 10,000
+big_test_v2(100000, 10000, verbose = False)
+#%% Same answer as memo_max_val, and the max_val2 style of arguments
+items = build_many_items(256, 10, 10)
+print(memo_max_val(items, 1000)[0], fast_max_val(items, 1000)[0])
+print(fast_max_val(names, 5, vals, weights))
 
 def build_many_items_reals(num_items, max_val, max_weight):
     items = []
@@ -196,4 +223,28 @@ def build_many_items_reals(num_items, max_val, max_weight):
     return items
 # build_many_items_reals would give an enormous space for possible
 # weights as random.random() returns a random floating point number
-# between 0.0 and 1.0.
\ No newline at end of file
+# between 0.0 and 1.0.
+#%% Branch and bound: prune max_val's tree instead of memoizing it
+def bb_max_val(to_consider, avail, vals = None, weights = None):
+    """Same arguments as fast_max_val, but weights may be floats
+       Returns a tuple of the total value of a solution to the
+       0/1 knapsack problem, the items of that solution, and the number
+       of nodes of max_val's decision tree that were explored."""
+    if vals is None:
+        vals, weights = knapsack_engine.item_arrays(to_consider)
+    val, taken, nodes = knapsack_engine.branch_and_bound_knapsack(
+        vals, weights, avail)
+    return val, tuple(to_consider[i] for i in taken), nodes
+
+def big_test_bb(num_items, avail = 40, reals = False):
+    if reals:
+        items = build_many_items_reals(num_items, 10, 10)
+    else:
+        items = build_many_items(num_items, 10, 10)
+    val, taken, nodes = bb_max_val(items, avail)
+    print('Total value of items taken =', val)
+    print('Explored', nodes, 'of', 2**(num_items + 1) - 1, 'nodes')
+
+big_test_bb(40)
+big_test_bb(40, reals = True)
+big_test_bb(200, reals = True)
\ No newline at end of file
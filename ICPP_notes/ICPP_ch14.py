@@ -6,6 +6,9 @@ Dynamic Programming
 """
 import random
 import pylab
+import numpy as np
+import walk_engine
+from running_stats import RunningStats
 #%% Random Walks ===========================================================
 #%% The Drunkard's Walk ====================================================
 # Types to implement: Location, Field, Drunk.
@@ -58,10 +61,17 @@ class Field(object):
 
 
 class Drunk(object):
+    # Subclasses set steps, a walk_engine.StepDistribution, instead of
+    # overriding take_step
+    steps = None
+
     def __init__(self, name = None):
         """Assumes name is a str"""
         self.name = name
     
+    def take_step(self):
+        return self.steps.draw_one()
+    
     def __str__(self):
         if self != None:
             return self.name
@@ -69,9 +79,8 @@ class Drunk(object):
 
 
 class UsualDrunk(Drunk):
-    def take_step(self):
-        step_choices = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        return random.choice(step_choices)
+    steps = walk_engine.StepDistribution(((0, 1), (0, -1), (1, 0),
+                                          (-1, 0)))
 
 
 def walk(f, d, num_steps):
@@ -83,11 +92,17 @@ def walk(f, d, num_steps):
         f.move_drunk(d)
     return start.dist_from(f.get_loc(d))
     
-def sim_walks(num_steps, num_trials, dClass):
+def sim_walks(num_steps, num_trials, dClass, fast=False):
     """Assumes num_steps an int >= 0, num_trials an int > 0,
        dClass a sublcass of Drunk
-       Simulates num_trials walks of num_steps steps each.
+       Simulates num_trials walks of num_steps steps each. If fast is
+       True, simulates all walks at once as arrays with walk_engine.
        Returns a list of the final distances for each trial"""
+    if fast:
+        rng = np.random.default_rng(random.getrandbits(64))
+        distances = walk_engine.final_distances(dClass.steps,
+                                                num_steps, num_trials, rng)
+        return [round(d, 1) for d in distances.tolist()]
     Homer = dClass()
     origin = Location(0, 0)
     distances = []
@@ -100,40 +115,94 @@ def sim_walks(num_steps, num_trials, dClass):
     return distances
 
 
-def drunk_test(walk_lengths, num_trials, dClass):
+def sim_walks_stats(num_steps, num_trials, dClass, fast=False):
+    """Same walks as sim_walks, but returns RunningStats of the final
+       distances instead of a list of all of them"""
+    stats = RunningStats()
+    if fast:
+        rng = np.random.default_rng(random.getrandbits(64))
+        distances = walk_engine.final_distances(dClass.steps,
+                                                num_steps, num_trials, rng)
+        stats.add_many(np.round(distances, 1))
+        return stats
+    Homer = dClass()
+    origin = Location(0, 0)
+    for t in range(num_trials):
+        f = Field()
+        f.add_drunk(Homer, origin)
+        stats.add(round(walk(f, Homer, num_steps), 1))
+    return stats
+
+def drunk_test(walk_lengths, num_trials, dClass, fast=False):
     """Assumes walk_lengths a sequence of ints >= 0
        num trials an int > 0, dClass a sublass of Drunk
-       For each number of steps in walk_lengths, runs sim_walks with
+       For each number of steps in walk_lengths, runs sim_walks_stats with
        num_trails walks and prints results"""
     for num_steps in walk_lengths:
-        distances = sim_walks(num_steps, num_trials, dClass)
+        distances = sim_walks_stats(num_steps, num_trials, dClass, fast)
         print(dClass.__name__, 'random walk of', num_steps, 'steps')
-        print(' Mean =', round(sum(distances)/len(distances), 4))
-        print(' Max =', max(distances), ' Min =', min(distances))
+        print(' Mean =', round(distances.get_mean(), 4))
+        print(' Max =', distances.get_max(), ' Min =', distances.get_min())
 #%%
 drunk_test((10, 100, 1000, 10000), 100, UsualDrunk)
 #%%
 drunk_test((0, 1), 100, UsualDrunk)
+#%% Same test using walk_engine
+drunk_test((10, 100, 1000, 10000, 100000), 100, UsualDrunk, fast=True)
 #%% Biased Random Walks ====================================================
 
 
 class ColdDrunk(Drunk):
-    def take_step(self):
-        step_choices = [(0.0, 1.0), (0.0, -2.0), (1.0, 0.0),\
-                        (-1.0, 0.0)]
-        return random.choice(step_choices)
+    steps = walk_engine.StepDistribution(((0.0, 1.0), (0.0, -2.0),
+                                          (1.0, 0.0), (-1.0, 0.0)))
 
 
 class EWDrunk(Drunk):
-    def take_step(self):
-        step_choices = [(1.0, 0.0), (-1.0, 0.0)]
-        return random.choice(step_choices)
+    steps = walk_engine.StepDistribution(((1.0, 0.0), (-1.0, 0.0)))
+
 
-def sim_all(drunkKinds, walk_lengths, num_trials):
+# Drunks are data: the same kind of drift as ColdDrunk, as probabilities
+class HeavyDrunk(Drunk):
+    steps = walk_engine.StepDistribution(((0.0, 1.0), (0.0, -1.0),
+                                          (1.0, 0.0), (-1.0, 0.0)),
+                                         (0.2, 0.3, 0.25, 0.25))
+
+def sweep_means(drunkKinds, walk_lengths, num_trials, seed=None,
+                num_workers=None):
+    """Walks each trial of each kind of drunk once, to the longest of
+       walk_lengths, noting the distance at every length on the way,
+       with the kinds and shards of trials spread over num_workers
+       processes (see walk_engine.sweep_mean_distances).
+       Returns a dict mapping each dClass to its list of mean distances,
+       one per walk length"""
+    means = walk_engine.sweep_mean_distances(
+        [dClass.steps for dClass in drunkKinds], walk_lengths, num_trials,
+        seed, num_workers)
+    return {drunkKinds[i]: means[i].tolist() for i in range(len(drunkKinds))}
+
+def sim_all(drunkKinds, walk_lengths, num_trials, sweep=False, seed=None,
+            num_workers=None):
+    """If sweep is True, prints only the mean distances, from one
+       sweep_means run over all kinds and lengths"""
+    if not sweep:
+        for dClass in drunkKinds:
+            drunk_test(walk_lengths, num_trials, dClass)
+        return
+    means = sweep_means(drunkKinds, walk_lengths, num_trials, seed,
+                        num_workers)
     for dClass in drunkKinds:
-        drunk_test(walk_lengths, num_trials, dClass)
+        for i in range(len(walk_lengths)):
+            print(dClass.__name__, 'random walk of', walk_lengths[i],
+                  'steps')
+            print(' Mean =', round(means[dClass][i], 4))
 #%%
 sim_all((UsualDrunk, ColdDrunk, EWDrunk), (100, 1000), 10)
+#%% Every kind and length in one sweep (walk_demo in parallel_demos.py
+# spreads it over a process pool, which this script cannot safely start)
+sim_all((UsualDrunk, ColdDrunk, EWDrunk), (100, 1000, 10000, 100000),
+        1000, sweep=True, seed=0, num_workers=1)
+#%% A drunk whose steps are not equally likely
+drunk_test((100, 1000, 10000), 100, HeavyDrunk, fast=True)
 #%%
 class styleIterator(object):
     def __init__(self, styles):
@@ -153,17 +222,25 @@ def sim_drunk(num_trials, dClass, walk_lengths):
     mean_distances = []
     for num_steps in walk_lengths:
         print('Starting simulation of', num_steps, 'steps')
-        trials = sim_walks(num_steps, num_trials, dClass)
-        mean = sum(trials) / len(trials)
-        mean_distances.append(mean)
+        trials = sim_walks_stats(num_steps, num_trials, dClass)
+        mean_distances.append(trials.get_mean())
     return mean_distances
 
-def sim_all1(drunkKinds, walk_lengths, num_trials):
+def sim_all1(drunkKinds, walk_lengths, num_trials, sweep=False, seed=None,
+             num_workers=None):
+    """If sweep is True, the means come from one sweep_means run instead
+       of a separate sim_drunk for each kind and length"""
     style_choice = styleIterator(('m-', 'r:', 'k-.'))
+    if sweep:
+        all_means = sweep_means(drunkKinds, walk_lengths, num_trials, seed,
+                                num_workers)
     for dClass in drunkKinds:
         cur_style = style_choice.next_style()
-        print('Starting simulation of', dClass.__name__)
-        means = sim_drunk(num_trials, dClass, walk_lengths)
+        if sweep:
+            means = all_means[dClass]
+        else:
+            print('Starting simulation of', dClass.__name__)
+            means = sim_drunk(num_trials, dClass, walk_lengths)
         pylab.plot(walk_lengths, means, cur_style,
                    label = dClass.__name__)
     pylab.title('Mean Distance from Origin ('
@@ -176,9 +253,19 @@ def sim_all1(drunkKinds, walk_lengths, num_trials):
 
 sim_all1((UsualDrunk, ColdDrunk, EWDrunk),
          (10, 100, 1000, 10000, 100000), 100)
+#%% Same plot from a sweep, with ten times the trials
+sim_all1((UsualDrunk, ColdDrunk, EWDrunk),
+         (10, 100, 1000, 10000, 100000), 1000, sweep=True, seed=0,
+         num_workers=1)
 #%%
 
-def get_final_locs(num_steps, num_trials, dClass):
+def get_final_locs(num_steps, num_trials, dClass, fast=False):
+    if fast:
+        rng = np.random.default_rng(random.getrandbits(64))
+        x, y = walk_engine.final_locations(dClass.steps,
+                                           num_steps, num_trials, rng)
+        x, y = x.tolist(), y.tolist()
+        return [Location(x[t], y[t]) for t in range(num_trials)]
     locs = []
     d = dClass()
     for t in range(num_trials):
@@ -211,20 +298,30 @@ def plot_locs(drunkKinds, num_steps, num_trials):
 
 plot_locs((UsualDrunk, ColdDrunk, EWDrunk), 100, 200)
 #%%
-def trace_walk(drunkKinds, num_steps):
+def trace_walk(drunkKinds, num_steps, fast=False, stride=1):
+    """If fast is True, records the walk with
+       walk_engine.trace_walk_arrays, keeping only every stride-th
+       location, instead of creating a Location for every step"""
     style_choice = styleIterator(('k+', 'r^', 'mo'))
     f = Field()
+    if fast:
+        rng = np.random.default_rng(random.getrandbits(64))
     for dClass in drunkKinds:
-        d = dClass()
-        f.add_drunk(d, Location(0, 0))
-        locs = []
-        for s in range(num_steps):
-            f.move_drunk(d)
-            locs.append(f.get_loc(d))
-        x_vals, y_vals = [], []
-        for loc in locs:
-            x_vals.append(loc.get_x())
-            y_vals.append(loc.get_y())
+        if fast:
+            trace = walk_engine.trace_walk_arrays(dClass.steps, num_steps,
+                                                  rng, stride)
+            x_vals, y_vals = trace[:, 0], trace[:, 1]
+        else:
+            d = dClass()
+            f.add_drunk(d, Location(0, 0))
+            locs = []
+            for s in range(num_steps):
+                f.move_drunk(d)
+                locs.append(f.get_loc(d))
+            x_vals, y_vals = [], []
+            for loc in locs:
+                x_vals.append(loc.get_x())
+                y_vals.append(loc.get_y())
         cur_style = style_choice.next_style()
         pylab.plot(x_vals, y_vals, cur_style,
                    label = dClass.__name__)
@@ -235,6 +332,9 @@ def trace_walk(drunkKinds, num_steps):
         pylab.legend(loc = 'best')
 
 trace_walk((UsualDrunk, ColdDrunk, EWDrunk), 200)
+#%% Tracing 10**7-step walks, plotting every 1000th location
+trace_walk((UsualDrunk, ColdDrunk, EWDrunk), 10**7, fast=True,
+           stride=1000)
 
 #%% Treacherous Fields =====================================================
 class oddField(Field):
@@ -256,20 +356,30 @@ class oddField(Field):
         if (x, y) in self.wormholes:
             self.drunks[drunk] = self.wormholes[(x, y)]
             
-def trace_walk_odd(drunkKinds, num_steps):
+def trace_walk_odd(drunkKinds, num_steps, fast=False):
+    """If fast is True, walks with walk_engine.odd_walk_traces, looking
+       the field's wormholes up in a WormholeGrid"""
     style_choice = styleIterator(('k+', 'r^', 'mo'))
     f = oddField(1000, 100, 200)
+    if fast:
+        grid = walk_engine.WormholeGrid(f.wormholes, 100, 200)
+        rng = np.random.default_rng(random.getrandbits(64))
     for dClass in drunkKinds:
-        d = dClass()
-        f.add_drunk(d, Location(0, 0))
-        locs = []
-        for s in range(num_steps):
-            f.move_drunk(d)
-            locs.append(f.get_loc(d))
-        x_vals, y_vals = [], []
-        for loc in locs:
-            x_vals.append(loc.get_x())
-            y_vals.append(loc.get_y())
+        if fast:
+            x_vals, y_vals = walk_engine.odd_walk_traces(
+                dClass.steps, num_steps, 1, grid, rng)
+            x_vals, y_vals = x_vals[0], y_vals[0]
+        else:
+            d = dClass()
+            f.add_drunk(d, Location(0, 0))
+            locs = []
+            for s in range(num_steps):
+                f.move_drunk(d)
+                locs.append(f.get_loc(d))
+            x_vals, y_vals = [], []
+            for loc in locs:
+                x_vals.append(loc.get_x())
+                y_vals.append(loc.get_y())
         cur_style = style_choice.next_style()
         pylab.plot(x_vals, y_vals, cur_style,
                    label = dClass.__name__)
@@ -279,4 +389,6 @@ def trace_walk_odd(drunkKinds, num_steps):
         pylab.ylabel('Steps North/South of Origin')
         pylab.legend(loc = 'best')
 
-trace_walk_odd((UsualDrunk, ColdDrunk, EWDrunk), 500)
\ No newline at end of file
+trace_walk_odd((UsualDrunk, ColdDrunk, EWDrunk), 500)
+#%% Same kind of trace, much longer walks
+trace_walk_odd((UsualDrunk, ColdDrunk, EWDrunk), 1000000, fast=True)
\ No newline at end of file
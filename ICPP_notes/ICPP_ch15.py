@@ -6,6 +6,7 @@ Stochastic Programs, Probability, and Distributions
 """
 import random
 import pylab
+from running_stats import RunningStats
 #%% Stochastic Programs =====================================================
 #def square_root(x, epsilon):
 #    """Assumes x and epsilon are of type float; 
@@ -40,11 +41,10 @@ def flip(num_flips):
 
 def flip_sim(num_flips_per_trial, num_trials):
     """Assumes num_flips_per_trial and num_trials positive ints"""
-    frac_heads = []
+    frac_heads = RunningStats() # the mean without keeping every trial
     for i in range(num_trials):
-        frac_heads.append(flip(num_flips_per_trial))
-    mean = sum(frac_heads)/len(frac_heads)
-    return mean
+        frac_heads.add(flip(num_flips_per_trial))
+    return frac_heads.get_mean()
 
 print('Mean =', flip_sim(10, 1))
 print('Mean =', flip_sim(10, 1))
@@ -5,7 +5,10 @@ Monte Carlo Simulation
 @author: Daniel J. Vera, Ph.D.
 """
 import random
+import time
 import numpy as np
+import craps_engine
+from running_stats import RunningStats
 
 #%% Pascal's Problem =======================================================
 def roll_die():
@@ -29,6 +32,29 @@ def check_Pascal(num_trials):
 
 check_Pascal(1000000)
 1 - (35.0 / 36.0)**24
+#%% Same estimate with the dice for many trials drawn as one array
+def check_Pascal_fast(num_trials, seed=None, chunk_size=2**18):
+    """Assumes num_trials an int > 0
+       Rolls all 24 pairs of dice for chunk_size trials at a time, so
+       memory use does not grow with num_trials. Prints the estimate
+       next to the exact probability 1 - (35/36)**24."""
+    rng = np.random.default_rng(seed)
+    num_wins = 0
+    for start in range(0, num_trials, chunk_size):
+        n = min(chunk_size, num_trials - start)
+        # Encode each throw of two dice as 6*(d1 - 1) + (d2 - 1), one
+        # of 36 equally likely values; 35 is a double six
+        throws = rng.integers(0, 36, (n, 24), dtype=np.int8)
+        # a trial wins if any of its 24 throws is a double six
+        num_wins += np.count_nonzero((throws == 35).any(axis=1))
+    estimate = num_wins / num_trials
+    exact = 1 - (35.0 / 36.0)**24
+    print('Probability of Winning =', estimate)
+    print('Exact probability =', round(exact, 6),
+          'Difference =', round(estimate - exact, 6))
+    return estimate
+
+check_Pascal_fast(100000000)
 
 #%% Pass or Don't Pass? ====================================================
 
@@ -68,34 +94,44 @@ class CrapsGame(object):
         return (self.dp_wins, self.dp_losses, self.dp_pushes)
 
 
-def craps_sim(hands_per_game, num_games):
-    """Assumes hands_per_game and num_games are ints > 0
-       Play num_games of hands_per_game hands; print results"""
-    games = []
-    
-    # Play num_games games
-    for t in range(num_games):
-        c = CrapsGame()
-        for i in range (hands_per_game):
-            c.play_hand()
-        games.append(c)
+def craps_sim(hands_per_game, num_games, backend='objects', seed=None,
+              num_workers=None):
+    """Assumes hands_per_game and num_games are ints > 0,
+       backend 'objects', 'numpy' or 'parallel'
+       Play num_games of hands_per_game hands; print results
+       The 'numpy' backend plays all hands as arrays with craps_engine,
+       in blocks with random streams derived from seed. 'parallel'
+       spreads those blocks over num_workers processes, so for a given
+       seed it prints the same results as 'numpy'. Per-game ROIs are
+       summarized with RunningStats as they are produced, so memory use
+       does not grow with num_games."""
+    if backend == 'numpy' or backend == 'parallel':
+        if backend == 'numpy':
+            num_workers = 1
+        pROI_stats, dpROI_stats = craps_engine.roi_stats(hands_per_game,
+                                                         num_games, seed,
+                                                         num_workers)
+    else:
+        pROI_stats, dpROI_stats = RunningStats(), RunningStats()
         
-    # Produce statistics for each game
-    pROI_per_game, dpROI_per_game = [], []
-    for g in games:
-        wins, losses = g.pass_results()
-        pROI_per_game.append((wins - losses) / float(hands_per_game))
-        wins, losses, pushes = g.dp_results()
-        dpROI_per_game.append((wins - losses) / float(hands_per_game))
+        # Play num_games games, producing statistics for each game
+        for t in range(num_games):
+            c = CrapsGame()
+            for i in range (hands_per_game):
+                c.play_hand()
+            wins, losses = c.pass_results()
+            pROI_stats.add((wins - losses) / float(hands_per_game))
+            wins, losses, pushes = c.dp_results()
+            dpROI_stats.add((wins - losses) / float(hands_per_game))
     
     # Produce and print summary statistics
     
-    meanROI = str(round((100*sum(pROI_per_game)/num_games), 4)) + '%'
-    sigma = str(round(100*np.std(pROI_per_game), 4)) + '%'
+    meanROI = str(round((100*pROI_stats.get_mean()), 4)) + '%'
+    sigma = str(round(100*pROI_stats.get_std(), 4)) + '%'
     print('Pass:',  'Mean ROI =', meanROI, 'Std. Dev. =', sigma)
       
-    meanROI = str(round((100*sum(dpROI_per_game)/num_games), 4)) + '%'
-    sigma = str(round(100*np.std(dpROI_per_game), 4)) + '%'
+    meanROI = str(round((100*dpROI_stats.get_mean()), 4)) + '%'
+    sigma = str(round(100*dpROI_stats.get_std(), 4)) + '%'
     print('Don\'t Pass:',  'Mean ROI =', meanROI, 'Std. Dev. =', sigma)
 
 # Structure of craps_sim simulation:
@@ -110,6 +146,11 @@ def craps_sim(hands_per_game, num_games):
 craps_sim(20, 10)
 craps_sim(1000000, 10)
 craps_sim(20, 1000000)
+# Same simulations with every hand played as arrays
+craps_sim(20, 10, 'numpy')
+craps_sim(1000000, 10, 'numpy')
+craps_sim(20, 1000000, 'numpy')
+# The 'parallel' backend is run from craps_demo in parallel_demos.py
 #%% Using Table Lookup to Improve Performance ==============================
 
 def play_hand_table(self):
@@ -145,15 +186,17 @@ def throw_needles(num_needles):
     return 4 * (in_circle / num_needles)
 
 def get_est(num_needles, num_trials):
-    estimates = []
+    estimates = RunningStats()
+    start = time.perf_counter()
     for t in range(num_trials):
         pi_guess = throw_needles(num_needles)
-        estimates.append(pi_guess)
-    sdev = np.std(estimates)
-    cur_est = sum(estimates) / len(estimates)
+        estimates.add(pi_guess)
+    rate = num_trials * num_needles / (time.perf_counter() - start)
+    sdev = estimates.get_std()
+    cur_est = estimates.get_mean()
     print('Est. = ', str(round(cur_est, 5)) + ',',
           'Std. Dev =', str(round(sdev, 5)) + ',',
-          'Needles =', num_needles)
+          'Needles =', num_needles, 'Needles/sec =', round(rate))
     return(cur_est, sdev)
 
 def est_pi(precision, num_trials):
@@ -165,3 +208,44 @@ def est_pi(precision, num_trials):
     return cur_est
 
 est_pi(0.01, 100)
+#%% Throwing needles in NumPy blocks, keeping needles already thrown
+def throw_more_needles(in_circle, num_needles, rng, max_draws=2**22):
+    """Assumes in_circle an array of ints, one per trial, num_needles
+       an int >= 0, rng a NumPy Generator
+       Throws num_needles more needles for every trial, in blocks of at
+       most max_draws needles, and adds the number landing in the
+       circle to in_circle. Compares x*x + y*y to 1, so no sqrt."""
+    num_trials = len(in_circle)
+    per_block = max(1, max_draws // num_trials)
+    thrown = 0
+    while thrown < num_needles:
+        block = min(per_block, num_needles - thrown)
+        x = rng.random((num_trials, block))
+        y = rng.random((num_trials, block))
+        in_circle += np.count_nonzero(x*x + y*y <= 1, axis=1)
+        thrown += block
+
+def est_pi_fast(precision, num_trials, seed=None):
+    """Same stopping rule as est_pi, but when num_needles doubles each
+       trial keeps the needles it has already thrown and only throws
+       the new ones"""
+    rng = np.random.default_rng(seed)
+    in_circle = np.zeros(num_trials, dtype=np.int64)
+    num_needles, thrown = 1000, 0
+    sdev = precision
+    while sdev > precision/1.96:
+        start = time.perf_counter()
+        throw_more_needles(in_circle, num_needles - thrown, rng)
+        rate = num_trials * (num_needles - thrown)\
+               / (time.perf_counter() - start)
+        thrown = num_needles
+        estimates = 4 * (in_circle / num_needles)
+        sdev = np.std(estimates)
+        cur_est = estimates.mean()
+        print('Est. = ', str(round(cur_est, 5)) + ',',
+              'Std. Dev =', str(round(sdev, 5)) + ',',
+              'Needles =', num_needles, 'Needles/sec =', round(rate))
+        num_needles *= 2
+    return cur_est
+
+est_pi_fast(0.01, 100)
@@ -8,30 +8,8 @@ import pylab
 import numpy as np
 import random
 import scipy.integrate
+from bm_data import get_bm_data
 #%% Sampling the Boston Marathon ===========================================
-def get_bm_data(filename):
-    """Read the contents of the given file. Assumes the file
-       in a comma-seperated format, with 6 elements in each entry:
-       0. Name (string), 1. Gender (string), 2. Age (int)
-       3. Division (int), 4. Country (string), 5. Overall time (float)
-       Returns: dict containing a list for each of the 6 variables."""
-    
-    data ={}
-    f = open(filename)
-    line = f.readline()
-    data['name'], data['gender'], data['age'] = [], [], []
-    data['division'], data['country'], data['time'], = [], [], []
-    while line != '':
-        split = line.split(',')
-        data['name'].append(split[0])
-        data['gender'].append(split[1])
-        data['age'].append(int(split[2]))
-        data['division'].append(split[3])
-        data['country'].append(split[4])
-        data['time'].append(float(split[5][:-1])) # remove \n
-        line = f.readline()
-    f.close()
-    return data
 
 def make_hist(data, bins, title, xlabel, ylabel):
     pylab.hist(data, bins)
@@ -8,6 +8,7 @@ import scipy
 import pylab
 import random
 from scipy import stats
+from bm_data import get_bm_data
 #%%
 #Code to create Figure 19.1
 treatment_dist = (119.5, 5.0)
@@ -108,29 +109,6 @@ print('Probability of result at least this',
 
 #%% Multiple Hypotheses ====================================================
 
-def get_bm_data(filename):
-    """Read the contents of the given file. Assumes the file
-       in a comma-seperated format, with 6 elements in each entry:
-       0. Name (string), 1. Gender (string), 2. Age (int)
-       3. Division (int), 4. Country (string), 5. Overall time (float)
-       Returns: dict containing a list for each of the 6 variables."""
-    
-    data ={}
-    f = open(filename)
-    line = f.readline()
-    data['name'], data['gender'], data['age'] = [], [], []
-    data['division'], data['country'], data['time'], = [], [], []
-    while line != '':
-        split = line.split(',')
-        data['name'].append(split[0])
-        data['gender'].append(split[1])
-        data['age'].append(split[2])
-        data['division'].append(split[3])
-        data['country'].append(split[4])
-        data['time'].append(float(split[5][:-1])) # remove \n
-        line = f.readline()
-    f.close()
-    return data
 
 data = get_bm_data('bm_results2012.txt')
 countries_to_compare = ['BEL', 'BRA', 'FRA', 'JPN', 'ITA']
@@ -4,17 +4,14 @@ ICPP Chapter 22
 A Quick Look at Machine Learning
 @author: Daniel J. Vera, Ph.D.
 """
+import os
+import tempfile
 import pylab
+import minkowski
+from minkowski import minkowski_dist
 #%% Feature Vectors ========================================================
 # No code.
 #%% Distance Metrics =======================================================
-def minkowski_dist(v1, v2, p):
-    """Assumes v1 and v2 are equal-length arrays of numbers
-       Returns Minkowski distance of order p between v1 and v2"""
-    dist = 0.0
-    for i in range(len(v1)):
-        dist += abs(v1[i] - v2[i])**p
-    return dist**(1 / p)
 
 
 class Animal(object):
@@ -38,35 +35,48 @@ class Animal(object):
                               2)
 
 
-def compare_animals(animals, precision):
-    """Assumes animals is a list of animals, precision an int >= 0
-       Builds a table of Euclidean distance between each animal"""
-    # Get labels for columns and rows
-    column_labels = []
+def distance_table(animals, p=2):
+    """Assumes animals is a list of animals
+       Computes each distance once, for pairs i < j only.
+       Returns the condensed array of distances of order p between the
+       animals (see minkowski.condensed_distances) and a list of their
+       names"""
+    labels = []
     for a in animals:
-        column_labels.append(a.get_name())
-    row_labels = column_labels[:]
+        labels.append(a.get_name())
+    features = pylab.array([a.get_features() for a in animals])
+    return minkowski.condensed_distances(features, p), labels
+
+def render_distance_table(distances, labels, precision):
+    """Assumes distances, labels as returned by distance_table,
+       precision an int >= 0
+       Draws the table of distances with pylab.table"""
+    column_labels = labels
+    row_labels = labels[:]
+    square = minkowski.condensed_to_square(distances, len(labels))
     table_vals = []
-    # Get distances between pairs of animals
-    # For each row
-    for a1 in animals:
+    for i in range(len(labels)):
         row = []
-        # For each column
-        for a2 in animals:
-            if a1 == a2:
+        for j in range(len(labels)):
+            if i == j:
                 row.append('--')
             else:
-                distance = a1.distance(a2)
-                row.append(str(round(distance, precision)))
+                row.append(str(round(square[i][j], precision)))
         table_vals.append(row)
-    # Produce table
     table = pylab.table(rowLabels = row_labels,
                         colLabels = column_labels,
                         cellText = table_vals,
                         cellLoc = 'center',
                         loc = 'center',
-                        colWidths = [0.2] * len(animals))
+                        colWidths = [0.2] * len(labels))
     table.scale(1, 2.5)
+    return table
+
+def compare_animals(animals, precision):
+    """Assumes animals is a list of animals, precision an int >= 0
+       Builds a table of Euclidean distance between each animal"""
+    distances, labels = distance_table(animals)
+    render_distance_table(distances, labels, precision)
     pylab.savefig('distances')
 
 rattlesnake = Animal('rattlesnake', [1, 1, 1, 1, 0])
@@ -76,4 +86,12 @@ dart_frog = Animal('dart frog', [1, 0, 1, 0, 4]) # can change 4 to 1
 animals = [rattlesnake, boa, dart_frog]
 alligator = Animal('alligator', [1, 1, 0, 1, 4]) # can change 4 to 1
 animals.append(alligator)
-compare_animals(animals, 3)
\ No newline at end of file
+compare_animals(animals, 3)
+#%% Distances between many more feature vectors, streamed to disk
+features = pylab.randint(0, 5, (500, 5))
+with tempfile.TemporaryDirectory() as dir_name:
+    distances = minkowski.save_condensed_distances(
+        features, os.path.join(dir_name, 'distances.npy'))
+    print(len(distances), 'distances, mean =',
+          round(distances.mean(), 3))
+    del distances # close the memory map before the file is removed
\ No newline at end of file
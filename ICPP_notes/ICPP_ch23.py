@@ -7,14 +7,9 @@ Clustering
 import pylab
 import random
 import numpy as np
+import kmeans_engine
+from minkowski import minkowski_dist
 #%% Class Cluster ==========================================================
-def minkowski_dist(v1, v2, p):
-    """Assumes v1 and v2 are equal-length arrays of numbers
-       Returns Minkowski distance of order p between v1 and v2"""
-    dist = 0.0
-    for i in range(len(v1)):
-        dist += abs(v1[i] - v2[i])**p
-    return dist**(1 / p)
 
 
 class Example(object):
@@ -99,15 +94,18 @@ def dissimilarity(clusters):
         tot_dist += c.variability()
     return tot_dist
 
-def try_kmeans(examples, num_clusters, num_trials, verbose=False):
-    """Calls kmeans num_trials times and returns the result with the
-       lowest dissimilarity"""
-    best = kmeans(examples, num_clusters, verbose)
+def try_kmeans(examples, num_clusters, num_trials, verbose=False,
+               kmeans_function=None):
+    """Calls kmeans_function (by default kmeans) num_trials times and
+       returns the result with the lowest dissimilarity"""
+    if kmeans_function is None:
+        kmeans_function = kmeans
+    best = kmeans_function(examples, num_clusters, verbose)
     min_dissimilarity = dissimilarity(best)
     trial = 1
     while trial < num_trials:
         try:
-            clusters = kmeans(examples, num_clusters, verbose)
+            clusters = kmeans_function(examples, num_clusters, verbose)
         except ValueError:
             continue # If failed, try again
         curr_dissimilarity = dissimilarity(clusters)
@@ -117,9 +115,34 @@ def try_kmeans(examples, num_clusters, num_trials, verbose=False):
         trial += 1
     return best
 
-def kmeans(examples, k, verbose=False):
-    # Get k randomly chosen initial centroids, create cluster for each
-    initial_centroids = random.sample(examples, k)
+def kmeans_pp_sample(examples, k):
+    """Assumes examples a list of at least k Examples
+       Chooses k examples by k-means++ seeding: the first uniformly, each
+       later one with probability proportional to its squared distance
+       from the closest example already chosen"""
+    chosen = [random.choice(examples)]
+    sq_dists = [e.distance(chosen[0])**2 for e in examples]
+    for i in range(1, k):
+        target = random.random() * sum(sq_dists)
+        cumulative = 0.0
+        for j in range(len(examples)):
+            cumulative += sq_dists[j]
+            if cumulative > target:
+                break
+        chosen.append(examples[j])
+        for j in range(len(examples)):
+            sq_dists[j] = min(sq_dists[j],
+                              examples[j].distance(chosen[-1])**2)
+    return chosen
+
+def kmeans(examples, k, verbose=False, init='random', tol=0.0):
+    """init is 'random' or 'kmeans++'; iterates until no centroid
+       moves more than tol"""
+    # Get k initial centroids, create cluster for each
+    if init == 'kmeans++':
+        initial_centroids = kmeans_pp_sample(examples, k)
+    else:
+        initial_centroids = random.sample(examples, k)
     clusters = []
     for e in initial_centroids:
         clusters.append(Cluster([e]))
@@ -154,7 +177,7 @@ def kmeans(examples, k, verbose=False):
         # Update each cluster; check if centroid has changed
         converged = True
         for i in range(k):
-            if clusters[i].update(new_clusters[i]) > 0.0:
+            if clusters[i].update(new_clusters[i]) > tol:
                 converged = False
         if verbose:
             print('Iteration #' + str(num_iterations))
@@ -163,6 +186,53 @@ def kmeans(examples, k, verbose=False):
             print('') # add blank line
     return clusters
 
+#%% K-means on an array of all examples
+def examples_to_array(examples):
+    """Assumes examples a non-empty list of Examples
+       Returns an (n, d) float array whose rows are their features"""
+    return np.array([e.features for e in examples], dtype=np.float64)
+
+def kmeans_fast(examples, k, verbose=False, init='random',
+                mode='batch', batch_size=1024, tol=0.0, reseed_empty=True):
+    """Same result as kmeans, but computes all example-to-centroid
+       distances of an iteration as one matrix operation using
+       kmeans_engine. init is 'random' or 'kmeans++'. With mode
+       'minibatch' each iteration only looks at batch_size examples
+       (tol should then be > 0). Mode 'hamerly' gives the same result as
+       'batch' but uses distance bounds to skip most distance
+       computations, printing the number skipped if verbose is True.
+       If reseed_empty is True, a cluster that loses all its examples is
+       given the one farthest from its centroid instead of raising
+       ValueError('Empty Cluster'), so try_kmeans never has to retry.
+       Returns a list of k Clusters."""
+    points = examples_to_array(examples)
+    if init == 'random':
+        initial_indices = random.sample(range(len(examples)), k)
+    else:
+        rng = np.random.default_rng(random.getrandbits(64))
+        initial_indices = kmeans_engine.initial_centroids(points, k, rng,
+                                                          init)
+    if mode == 'minibatch':
+        rng = np.random.default_rng(random.getrandbits(64))
+        labels, centroids, num_iterations =\
+                kmeans_engine.minibatch_kmeans(points, k, initial_indices,
+                                               rng, batch_size, tol,
+                                               verbose=verbose)
+    elif mode == 'hamerly':
+        labels, centroids, num_iterations, skipped =\
+                kmeans_engine.hamerly_kmeans(points, k, initial_indices,
+                                             verbose=verbose,
+                                             reseed_empty=reseed_empty)
+    else:
+        labels, centroids, num_iterations =\
+                kmeans_engine.kmeans_arrays(points, k, initial_indices,
+                                            verbose=verbose, tol=tol,
+                                            reseed_empty=reseed_empty)
+    members = [[] for i in range(k)]
+    for i in range(len(examples)):
+        members[labels[i]].append(examples[i])
+    return [Cluster(m) for m in members]
+
 #%% A Contrived Example ====================================================
 def gen_distribution(x_mean, x_sd, y_mean, y_sd, n, name_prefix):
     samples = []
@@ -230,6 +300,61 @@ contrived_test2(40, 2)
 contrived_test2(40, 3)
 #%%
 contrived_test2(40, 6)
+#%% Same clustering of many more points using kmeans_fast
+def large_test(num_trials, k, n):
+    examples = gen_distribution(3, 1, 5, 1, n, 'A')\
+               + gen_distribution(6, 1, 6, 1, n, 'B')\
+               + gen_distribution(3, 1, 8, 1, n, 'C')
+    clusters = try_kmeans(examples, k, num_trials,
+                          kmeans_function=kmeans_fast)
+    print('Final result has dissimilarity',
+          round(dissimilarity(clusters), 3))
+    for c in clusters:
+        print(' Centroid', c.get_centroid().get_features())
+
+large_test(5, 3, 50000)
+#%% k-means++ seeding and mini-batch updates
+examples = gen_distribution(3, 1, 5, 1, 100000, 'A')\
+           + gen_distribution(6, 1, 6, 1, 100000, 'B')\
+           + gen_distribution(3, 1, 8, 1, 100000, 'C')
+for mode in ('batch', 'minibatch'):
+    clusters = kmeans_fast(examples, 3, init='kmeans++', mode=mode,
+                           tol=0.001)
+    print(mode, 'dissimilarity =', round(dissimilarity(clusters), 3))
+#%% Same clustering, skipping distances ruled out by the triangle inequality
+random.seed(0)
+clusters = kmeans_fast(examples, 3, verbose=True, mode='hamerly')
+#%% Restarts in parallel, abandoning trials that cannot win
+def try_kmeans_parallel(examples, num_clusters, num_trials, seed=None,
+                        num_workers=None, verbose=False):
+    """Runs num_trials k-means trials across a process pool using
+       kmeans_engine.try_kmeans_arrays
+       Returns the clustering with the lowest dissimilarity as a list of
+       Clusters and a list with a dict describing each trial"""
+    points = examples_to_array(examples)
+    best, trials = kmeans_engine.try_kmeans_arrays(points, num_clusters,
+                                                   num_trials, seed,
+                                                   num_workers)
+    if verbose:
+        for t in trials:
+            print('Trial', t['trial'], t['status'] + ',',
+                  t['iterations'], 'iterations,',
+                  round(t['seconds'], 3), 'seconds')
+    if best is None:
+        raise ValueError('No trial converged')
+    members = [[] for i in range(num_clusters)]
+    for i in range(len(examples)):
+        members[best['labels'][i]].append(examples[i])
+    return [Cluster(m) for m in members], trials
+
+# One worker, since a pool's workers would each re-run this script;
+# kmeans_demo in parallel_demos.py runs the trials in a pool
+examples = gen_distribution(3, 1, 5, 1, 50000, 'A')\
+           + gen_distribution(6, 1, 6, 1, 50000, 'B')
+clusters, trials = try_kmeans_parallel(examples, 2, 40, seed=0,
+                                       num_workers=1, verbose=True)
+print('Final result has dissimilarity',
+      round(dissimilarity(clusters), 3))
 #%% A Less Contrived Example ===============================================
 def read_mammal_data(fname):
     data_file = open(fname, 'r')
@@ -8,6 +8,9 @@ import random
 import pylab
 import sklearn.linear_model
 import numpy as np
+import knn_engine
+from bm_data import get_bm_data
+from minkowski import minkowski_dist
 #%% Evaluating Classifiers =================================================
 def accuracy(true_pos, false_pos, true_neg, false_neg):
     numerator = true_pos + true_neg
@@ -51,29 +54,6 @@ def get_stats(true_pos, false_pos, true_neg, false_neg, to_print=True):
     return (accur, sens, spec, ppv)
 
 #%% Predicting the Gender of Runners =======================================
-def get_bm_data(filename):
-    """Read the contents of the given file. Assumes the file
-       in a comma-seperated format, with 6 elements in each entry:
-       0. Name (string), 1. Gender (string), 2. Age (int)
-       3. Division (int), 4. Country (string), 5. Overall time (float)
-       Returns: dict containing a list for each of the 6 variables."""
-    
-    data ={}
-    f = open(filename)
-    line = f.readline()
-    data['name'], data['gender'], data['age'] = [], [], []
-    data['division'], data['country'], data['time'], = [], [], []
-    while line != '':
-        split = line.split(',')
-        data['name'].append(split[0])
-        data['gender'].append(split[1])
-        data['age'].append(int(split[2]))
-        data['division'].append(split[3])
-        data['country'].append(split[4])
-        data['time'].append(float(split[5][:-1])) # remove \n
-        line = f.readline()
-    f.close()
-    return data
 
 
 class Runner(object):
@@ -82,10 +62,7 @@ class Runner(object):
         self.label = gender
         
     def feature_dist(self, other):
-        dist = 0.0
-        for i in range(len(self.feature_vec)):
-            dist += abs(self.feature_vec[i] - other.feature_vec[i])**2
-        return dist**0.5
+        return minkowski_dist(self.feature_vec, other.feature_vec, 2)
     
     def get_time(self):
         return self.feature_vec[1]
@@ -114,8 +91,8 @@ def build_marathon_examples(filename):
     return examples
 
 def divide80_20(examples):
-    sample_indices = random.sample(range(len(examples)), 
-                                   len(examples) // 5)
+    sample_indices = set(random.sample(range(len(examples)),
+                                       len(examples) // 5))
     training_set, test_set = [], []
     for i in range(len(examples)):
         if i in sample_indices:
@@ -143,12 +120,17 @@ def find_k_nearest(example, example_set, k):
             max_dist = max(distances)
     return k_nearest, distances
 
-def k_nearest_classify(training, test_set, label, k):
-    """Assumes training and test_set are lists of examples, k an int
+def k_nearest_classify(training, test_set, label, k, backend='linear'):
+    """Assumes training and test_set are lists of examples, k an int,
+       backend one of 'linear', 'kdtree', or 'brute'
        Uses a k-nearest neighbor classifier to predict whether each
-       example in test_set has the given label.
+       example in test_set has the given label. 'kdtree' and 'brute'
+       classify the whole test_set at once using knn_engine.
        Returns number of true positives, false positives,
        true negatives, and false negatives"""
+    if backend != 'linear':
+        return knn_engine.knn_classify(training, test_set, label, k,
+                                       backend)
     true_pos, false_pos, true_neg, false_neg = 0, 0, 0, 0
     for e in test_set:
         nearest, distances = find_k_nearest(e, training, k)
@@ -174,6 +156,10 @@ training, test_set = divide80_20(examples)
 true_pos, false_pos, true_neg, false_neg =\
    k_nearest_classify(training, test_set, 'M', 9)
 get_stats(true_pos, false_pos, true_neg, false_neg)
+#%% Same classification, all test examples at once using a KD-tree
+true_pos, false_pos, true_neg, false_neg =\
+   k_nearest_classify(training, test_set, 'M', 9, 'kdtree')
+get_stats(true_pos, false_pos, true_neg, false_neg)
 #%%
 def prevalence_classify(training, test_set, label):
     """Assumes training and test_set lists of examples
@@ -210,17 +196,20 @@ true_pos, false_pos, true_neg, false_neg =\
     k_nearest_classify(reduced_training, test_set, 'M', 9)
 get_stats(true_pos, false_pos, true_neg, false_neg)
 #%% n-fold cross validation
-def find_k(training, min_k, max_k, num_folds, label):
+def find_k(training, min_k, max_k, num_folds, label, backend='linear'):
     # Find average accuracy for range of odd values of k
     accuracies = []
     for k in range(min_k, max_k + 1, 2):
         score = 0.0
         for i in range(num_folds):
-            # downsample to reduce computation time
-            fold = random.sample(training, min(5000, len(training)))
+            if backend == 'linear':
+                # downsample to reduce computation time
+                fold = random.sample(training, min(5000, len(training)))
+            else:
+                fold = training
             examples, test_set = divide80_20(fold)
             true_pos, false_pos, true_neg, false_neg =\
-            k_nearest_classify(examples, test_set, label, k)
+            k_nearest_classify(examples, test_set, label, k, backend)
             score += accuracy(true_pos, false_pos, true_neg, false_neg)
         accuracies.append(score/num_folds)
     pylab.plot(range(min_k, max_k +1, 2), accuracies)
@@ -230,6 +219,31 @@ def find_k(training, min_k, max_k, num_folds, label):
     pylab.ylabel('Accuracy')
 
 find_k(training, 1, 21, 5, "M")
+#%% Same cross validation on the full training set using a KD-tree
+find_k(training, 1, 21, 5, "M", 'kdtree')
+#%% Cross validation with one neighbor search per fold, folds in parallel
+def find_k_parallel(training, min_k, max_k, num_folds, label, seed=None,
+                    num_workers=None):
+    """Assumes training a list of examples, min_k and max_k odd ints
+       Same plot as find_k, but each fold finds the max_k nearest
+       neighbors once and derives the vote for every smaller k from
+       them. Folds run in a process pool; a given seed gives the same
+       curve for any num_workers."""
+    train_feats, train_labels = knn_engine.pack_examples(training)
+    ks = range(min_k, max_k + 1, 2)
+    accuracies = knn_engine.cross_validate_k(train_feats, train_labels,
+                                             label, ks, num_folds, seed,
+                                             num_workers=num_workers)
+    pylab.plot(ks, accuracies)
+    pylab.title('Average Accuracy vs k (' + str(num_folds)\
+                + ' folds)')
+    pylab.xlabel('k')
+    pylab.ylabel('Accuracy')
+    return accuracies
+
+# Serial here: pool workers would re-import this whole script. The
+# pooled run is knn_demo in parallel_demos.py
+find_k_parallel(training, 1, 21, 5, "M", seed=0, num_workers=1)
 
 #%% Regression-based Classifiers ===========================================
 # Build training sets for men and women
@@ -333,13 +347,22 @@ print('[2, 0] probs =', model.predict_proba([[2, 0]])[0])
 print('[2, 2] probs =', model.predict_proba([[2, 2]])[0])
 
 #%% back to Boston marathon example
-def apply_model(model, test_set, label, prob=0.5):
-    # Create vector containing feature vectors for all test examples
+def get_scores(model, test_set, label):
+    """Assumes model a fitted classifier with predict_proba
+       Returns an array of the probability model assigns to label for
+       each example in test_set"""
     test_feature_vecs = [e.get_features() for e in test_set]
-    probs = model.predict_proba(test_feature_vecs)
+    label_index = list(model.classes_).index(label)
+    return model.predict_proba(test_feature_vecs)[:, label_index]
+
+def apply_model(model, test_set, label, prob=0.5, scores=None):
+    """If scores (from get_scores) is supplied, model is not used to
+       score test_set again"""
+    if scores is None:
+        scores = get_scores(model, test_set, label)
     true_pos, false_pos, true_neg, false_neg = 0, 0, 0, 0
-    for i in range(len(probs)):
-        if probs[i][1] > prob:
+    for i in range(len(scores)):
+        if scores[i] > prob:
             if test_set[i].get_label() == label:
                 true_pos += 1
             else:
@@ -379,10 +402,11 @@ get_stats(true_pos, false_pos, true_neg, false_neg)
 #%% ROC curves
 def build_ROC(model, test_set, label, title, plot=True):
     x_vals, y_vals = [], []
+    scores = get_scores(model, test_set, label)
     p = 0.0
     while p <= 1.0:
         true_pos, false_pos, true_neg, false_neg =\
-                                  apply_model(model, test_set, label, p)
+                          apply_model(model, test_set, label, p, scores)
         x_vals.append(1.0 - specificity(true_neg, false_pos))
         y_vals.append(sensitivity(true_pos, false_neg))
         p += 0.01
@@ -398,6 +422,49 @@ def build_ROC(model, test_set, label, title, plot=True):
 
 build_ROC(model, test, 'M', 'ROC for Predicting Gender')
 
+#%% ROC curve from a single pass over sorted scores
+def roc_curve(scores, actual):
+    """Assumes scores an array of floats, actual an equal-length array
+       of bools that are True for examples with the label
+       Sorts the scores once and counts true and false positives
+       cumulatively, giving one point for every distinct threshold.
+       Returns arrays of 1 - specificity, sensitivity, and the
+       thresholds (an example is guessed positive if score >= t)"""
+    order = np.argsort(-scores, kind='stable')
+    sorted_scores, sorted_actual = scores[order], actual[order]
+    true_pos = np.cumsum(sorted_actual)
+    false_pos = np.cumsum(~sorted_actual)
+    # Last position of each run of equal scores
+    last = np.append(np.nonzero(np.diff(sorted_scores))[0],
+                     len(scores) - 1)
+    true_pos = np.append(0, true_pos[last])
+    false_pos = np.append(0, false_pos[last])
+    thresholds = np.append(np.inf, sorted_scores[last])
+    return (false_pos / false_pos[-1], true_pos / true_pos[-1],
+            thresholds)
+
+def build_ROC_fast(model, test_set, label, title, plot=True,
+                   scores=None):
+    """Same plot and AUROC as build_ROC, but calls predict_proba at
+       most once and uses every distinct threshold rather than steps
+       of 0.01. If scores (from get_scores) is supplied, model is not
+       used to score test_set again."""
+    if scores is None:
+        scores = get_scores(model, test_set, label)
+    actual = np.array([e.get_label() == label for e in test_set])
+    x_vals, y_vals, thresholds = roc_curve(scores, actual)
+    auroc = sklearn.metrics.auc(x_vals, y_vals)
+    if plot:
+        pylab.plot(x_vals, y_vals)
+        pylab.plot([0, 1], [0, 1,], '--')
+        pylab.title(title + ' (AUROC = '\
+                               + str(round(auroc, 3)) + ')')
+        pylab.xlabel('1 - Specificity')
+        pylab.ylabel('Sensitivity')
+    return auroc
+
+build_ROC_fast(model, test, 'M', 'ROC for Predicting Gender')
+
 #%% Finger exercise: Write code to plot the ROC curve and compute the AUROC
 # when the model built in Figure 24.15 is tested on 200 randomly chosen 
 # competitors. Use that code to investigate the impact of the number of 
@@ -416,10 +483,11 @@ model_fe = sklearn.linear_model.LogisticRegression().fit(feature_vecs, labels)
 
 def build_ROC_test(model, test_set, label, title, plot=True):
     x_vals, y_vals = [], []
+    scores = get_scores(model, test_set, label)
     p = 0.0
     while p <= 1.0:
         true_pos, false_pos, true_neg, false_neg =\
-                                  apply_model(model, test_set, label, p)
+                          apply_model(model, test_set, label, p, scores)
         x_vals.append(1.0 - specificity(true_neg, false_pos))
         y_vals.append(sensitivity(true_pos, false_neg))
         p += 0.01
@@ -450,13 +518,6 @@ pylab.ylabel('AUROC')
 pylab.xlim([5, 1000])
 pylab.ylim([0.4, 1])
 #%% Surviving the Titanic ==================================================
-def minkowski_dist(v1, v2, p):
-    """Assumes v1 and v2 are equal-length arrays of numbers
-       Returns Minkowski distance of order p between v1 and v2"""
-    dist = 0.0
-    for i in range(len(v1)):
-        dist += abs(v1[i] - v2[i])**p
-    return dist**(1 / p)
 
 
 class Passenger(object):
@@ -532,13 +593,16 @@ def test_models(examples, num_trials, print_stats, print_weights):
         feature_vecs = pylab.array(feature_vecs)
         labels = pylab.array(labels)
         model =\
-          sklearn.linear_model.LogisticRegresssion().fit(feature_vecs,
-                                                         labels)
+          sklearn.linear_model.LogisticRegression().fit(feature_vecs,
+                                                        labels)
         for i in range(len(Passenger.features)):
             weights[i].append(model.coef_[0][i])
+        # Score the test set once; reuse for the stats and the AUROC
+        scores = get_scores(model, test_set, survived)
         true_pos, false_pos, true_neg, false_neg =\
-                           apply_model(model, test_set, 1, 0.5)
-        auroc = buld_ROC(model, test_set, 1, None, False)
+                  apply_model(model, test_set, survived, 0.5, scores)
+        auroc = build_ROC_fast(model, test_set, survived, None, False,
+                               scores)
         tmp = get_stats(true_pos, false_pos, true_neg, false_neg, False)
         stats.append(tmp + (auroc,))
     print('Averages for', num_trials, 'trials')
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Shared loader for the Boston Marathon results in bm_results2012.txt
+Used by ICPP Chapters 17, 19 and 24
+@author: Daniel J. Vera, Ph.D.
+"""
+import hashlib
+import os
+import numpy as np
+
+COLUMNS = ('name', 'gender', 'gender_categories', 'age', 'division',
+           'country', 'country_categories', 'time')
+
+def parse_bm_file(filename):
+    """Assumes filename a file with one runner per line in the format
+       Name,Gender,Age,Division,Country,Time
+       Names are split off from the right, so a comma in a name cannot
+       shift the other fields, and surrounding quotes are removed. (A
+       csv reader does not work here: some names in the file have an
+       unmatched quote, which would swallow the following lines.)
+       Returns a dict of NumPy arrays keyed by COLUMNS; gender and
+       country are int16 codes into the matching _categories array"""
+    names, genders, ages, divisions, countries, times = \
+        [], [], [], [], [], []
+    f = open(filename)
+    for line in f:
+        name, gender, age, division, country, time = \
+            line.rstrip('\n').rsplit(',', 5)
+        names.append(name.strip('"'))
+        genders.append(gender)
+        ages.append(age)
+        divisions.append(division)
+        countries.append(country)
+        times.append(time)
+    f.close()
+    data = {'name': np.array(names),
+            'age': np.array(ages).astype(np.int16),
+            'division': np.array(divisions).astype(np.int32),
+            'time': np.array(times).astype(np.float32)}
+    for column, vals in (('gender', genders), ('country', countries)):
+        categories, codes = np.unique(vals, return_inverse=True)
+        data[column] = codes.astype(np.int16)
+        data[column + '_categories'] = categories
+    return data
+
+def file_key(filename):
+    """Returns a tuple of the size, modification time and SHA-1 hash of
+       the contents of filename"""
+    stat = os.stat(filename)
+    f = open(filename, 'rb')
+    digest = hashlib.sha1(f.read()).hexdigest()
+    f.close()
+    return (str(stat.st_size), str(stat.st_mtime_ns), digest)
+
+def read_cache_key(cache_dir):
+    try:
+        f = open(os.path.join(cache_dir, 'key.txt'))
+    except FileNotFoundError:
+        return None
+    key = tuple(f.read().split())
+    f.close()
+    if len(key) != 3:
+        return None
+    return key
+
+def write_cache_key(cache_dir, key):
+    f = open(os.path.join(cache_dir, 'key.txt'), 'w')
+    f.write(' '.join(key))
+    f.close()
+
+def write_cache(cache_dir, data, key):
+    os.makedirs(cache_dir, exist_ok=True)
+    for column in COLUMNS:
+        np.save(os.path.join(cache_dir, column + '.npy'), data[column])
+    # Written last, so an interrupted write leaves no valid key
+    write_cache_key(cache_dir, key)
+
+def load_bm_columns(filename, use_cache=True):
+    """Assumes filename is in the format described in parse_bm_file
+       Parsed columns are cached as .npy files in the directory
+       filename + '.cache'. The cache is used if the file's size and
+       modification time match those it was built from, or failing that
+       if the file's SHA-1 hash does; otherwise the file is reparsed.
+       Returns a dict of arrays keyed by COLUMNS; cached arrays are
+       read-only memory maps"""
+    if not use_cache:
+        return parse_bm_file(filename)
+    cache_dir = filename + '.cache'
+    cached_key = read_cache_key(cache_dir)
+    stat = os.stat(filename)
+    if cached_key is None\
+       or cached_key[:2] != (str(stat.st_size), str(stat.st_mtime_ns)):
+        key = file_key(filename)
+        if cached_key is None or cached_key[2] != key[2]:
+            data = parse_bm_file(filename)
+            write_cache(cache_dir, data, key)
+            return data
+        write_cache_key(cache_dir, key) # same contents, new mtime
+    data = {}
+    for column in COLUMNS:
+        data[column] = np.load(os.path.join(cache_dir, column + '.npy'),
+                               mmap_mode='r')
+    return data
+
+def get_bm_data(filename):
+    """Compatibility view of load_bm_columns in the format of the
+       get_bm_data functions previously defined in Chapters 17, 19 and
+       24: a dict containing a list for each of the 6 variables
+       0. Name (string), 1. Gender (string), 2. Age (int)
+       3. Division (string), 4. Country (string), 5. Overall time (float)
+       Names no longer include their quotation marks."""
+    columns = load_bm_columns(filename)
+    genders = columns['gender_categories'][columns['gender']]
+    countries = columns['country_categories'][columns['country']]
+    data = {}
+    data['name'] = columns['name'].tolist()
+    data['gender'] = genders.tolist()
+    data['age'] = columns['age'].tolist()
+    data['division'] = [str(d) for d in columns['division']]
+    data['country'] = countries.tolist()
+    # times have two decimal places in the file; undo float32 rounding
+    data['time'] = [round(t, 2) for t in columns['time'].tolist()]
+    return data
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized craps simulation
+Used by craps_sim in ICPP Chapter 16 and craps_sim.py
+@author: Daniel J. Vera, Ph.D.
+"""
+import concurrent.futures
+import numpy as np
+from running_stats import RunningStats
+
+# Probability that the pass line wins a hand, by the come-out throw.
+# For a point, the chance of making it before a 7 (as in play_hand_table)
+WIN_PROB = np.zeros(13)
+WIN_PROB[[7, 11]] = 1.0
+WIN_PROB[[4, 10]] = 1/3
+WIN_PROB[[5, 9]] = 2/5
+WIN_PROB[[6, 8]] = 5/11
+
+def play_hands(num_hands, rng):
+    """Assumes num_hands an int >= 0, rng a NumPy Generator
+       Plays num_hands hands of craps. A hand with a point is resolved
+       with a single uniform draw against WIN_PROB, which has the same
+       distribution as rolling until the point or a 7.
+       Returns boolean arrays saying whether the pass line won each
+       hand and whether don't pass pushed (came out 12)"""
+    throws = rng.integers(1, 7, size=(2, num_hands), dtype=np.int8).sum(
+        axis=0)
+    pass_wins = rng.random(num_hands) < WIN_PROB[throws]
+    return pass_wins, throws == 12
+
+def play_games(hands_per_game, num_games, rng, chunk_size=2**22):
+    """Assumes hands_per_game and num_games are ints > 0, rng a NumPy
+       Generator
+       Plays the hands chunk_size at a time, so memory use does not
+       grow with the number of hands.
+       Returns int arrays, one entry per game, of pass wins, pass
+       losses, don't pass wins, don't pass losses, and don't pass
+       pushes, matching the counters of CrapsGame"""
+    pass_wins = np.zeros(num_games, dtype=np.int64)
+    dp_pushes = np.zeros(num_games, dtype=np.int64)
+    total_hands = hands_per_game * num_games
+    for start in range(0, total_hands, chunk_size):
+        stop = min(start + chunk_size, total_hands)
+        wins, pushes = play_hands(stop - start, rng)
+        games = np.arange(start, stop) // hands_per_game
+        pass_wins += np.bincount(games[wins], minlength=num_games)
+        dp_pushes += np.bincount(games[pushes], minlength=num_games)
+    pass_losses = hands_per_game - pass_wins
+    # don't pass loses when pass wins, and wins when pass loses unless
+    # the hand is a push
+    return (pass_wins, pass_losses, pass_losses - dp_pushes, pass_wins,
+            dp_pushes)
+
+def game_blocks(hands_per_game, num_games, seed, block_hands):
+    """Splits num_games games into blocks of about block_hands hands
+       Returns a list of (hands_per_game, games in block, SeedSequence)
+       tuples, one per block, each with its own child of
+       SeedSequence(seed)"""
+    games_per_block = max(1, block_hands // hands_per_game)
+    block_sizes = [min(games_per_block, num_games - start)
+                   for start in range(0, num_games, games_per_block)]
+    children = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    return [(hands_per_game, block_sizes[i], children[i])
+            for i in range(len(block_sizes))]
+
+def map_blocks(function, tasks, num_workers):
+    """Returns the list of function applied to each task, in order,
+       computed in a process pool unless num_workers is 1"""
+    if num_workers == 1:
+        return list(map(function, tasks))
+    with concurrent.futures.ProcessPoolExecutor(num_workers) as pool:
+        return list(pool.map(function, tasks))
+
+def _play_block(args):
+    hands_per_game, num_games, seed_seq = args
+    return play_games(hands_per_game, num_games,
+                      np.random.default_rng(seed_seq))
+
+def play_games_parallel(hands_per_game, num_games, seed=None,
+                        num_workers=None, block_hands=2**18):
+    """Assumes hands_per_game and num_games are ints > 0, num_workers
+       None (one per core) or an int > 0
+       Splits the games into blocks of about block_hands hands, each
+       played in a process pool with its own child of
+       SeedSequence(seed). The blocks depend only on hands_per_game and
+       num_games, so for a given seed the counts are the same whatever
+       the number of workers. Blocks are kept small so there are enough
+       of them to keep many cores busy; a block always holds whole
+       games, so there are at most num_games blocks. Workers return only
+       the per-game counters.
+       Returns the same arrays as play_games"""
+    results = map_blocks(_play_block,
+                         game_blocks(hands_per_game, num_games, seed,
+                                     block_hands),
+                         num_workers)
+    return tuple(np.concatenate([r[i] for r in results])
+                 for i in range(5))
+
+def _block_roi_stats(args):
+    hands_per_game = args[0]
+    p_wins, p_losses, dp_wins, dp_losses, dp_pushes = _play_block(args)
+    pass_stats, dp_stats = RunningStats(), RunningStats()
+    pass_stats.add_many((p_wins - p_losses) / float(hands_per_game))
+    dp_stats.add_many((dp_wins - dp_losses) / float(hands_per_game))
+    return pass_stats, dp_stats
+
+def roi_stats(hands_per_game, num_games, seed=None, num_workers=1,
+              block_hands=2**18):
+    """Same blocks and random streams as play_games_parallel, but each
+       block is reduced to RunningStats of the per-game ROI as soon as
+       it is played, so memory use does not grow with num_games.
+       Returns RunningStats of the pass and don't pass ROI per game"""
+    results = map_blocks(_block_roi_stats,
+                         game_blocks(hands_per_game, num_games, seed,
+                                     block_hands),
+                         num_workers)
+    pass_stats, dp_stats = RunningStats(), RunningStats()
+    for block_pass_stats, block_dp_stats in results:
+        pass_stats.merge(block_pass_stats)
+        dp_stats.merge(block_dp_stats)
+    return pass_stats, dp_stats
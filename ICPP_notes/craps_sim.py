@@ -5,7 +5,8 @@ Created on Thu Jul 20 10:06:31 2017
 @author: dvera
 """
 import random
-import numpy as np
+import craps_engine
+from running_stats import RunningStats
 
 def roll_die():
     return random.choice([1, 2, 3, 4, 5, 6])
@@ -47,34 +48,44 @@ class CrapsGame(object):
         return (self.dp_wins, self.dp_losses, self.dp_pushes)
 
 
-def craps_sim(hands_per_game, num_games):
-    """Assumes hands_per_game and num_games are ints > 0
-       Play num_games of hands_per_game hands; print results"""
-    games = []
-    
-    # Play num_games games
-    for t in range(num_games):
-        c = CrapsGame()
-        for i in range (hands_per_game):
-            c.play_hand()
-        games.append(c)
+def craps_sim(hands_per_game, num_games, backend='objects', seed=None,
+              num_workers=None):
+    """Assumes hands_per_game and num_games are ints > 0,
+       backend 'objects', 'numpy' or 'parallel'
+       Play num_games of hands_per_game hands; print results
+       The 'numpy' backend plays all hands as arrays with craps_engine,
+       in blocks with random streams derived from seed. 'parallel'
+       spreads those blocks over num_workers processes, so for a given
+       seed it prints the same results as 'numpy'. Per-game ROIs are
+       summarized with RunningStats as they are produced, so memory use
+       does not grow with num_games."""
+    if backend == 'numpy' or backend == 'parallel':
+        if backend == 'numpy':
+            num_workers = 1
+        pROI_stats, dpROI_stats = craps_engine.roi_stats(hands_per_game,
+                                                         num_games, seed,
+                                                         num_workers)
+    else:
+        pROI_stats, dpROI_stats = RunningStats(), RunningStats()
         
-    # Produce statistics for each game
-    pROI_per_game, dpROI_per_game = [], []
-    for g in games:
-        wins, losses = g.pass_results()
-        pROI_per_game.append((wins - losses) / float(hands_per_game))
-        wins, losses, pushes = g.dp_results()
-        dpROI_per_game.append((wins - losses) / float(hands_per_game))
+        # Play num_games games, producing statistics for each game
+        for t in range(num_games):
+            c = CrapsGame()
+            for i in range (hands_per_game):
+                c.play_hand()
+            wins, losses = c.pass_results()
+            pROI_stats.add((wins - losses) / float(hands_per_game))
+            wins, losses, pushes = c.dp_results()
+            dpROI_stats.add((wins - losses) / float(hands_per_game))
     
     # Produce and print summary statistics
     
-    meanROI = str(round((100*sum(pROI_per_game)/num_games), 4)) + '%'
-    sigma = str(round(100*np.std(pROI_per_game), 4)) + '%'
+    meanROI = str(round((100*pROI_stats.get_mean()), 4)) + '%'
+    sigma = str(round(100*pROI_stats.get_std(), 4)) + '%'
     print('Pass:',  'Mean ROI =', meanROI, 'Std. Dev. =', sigma)
       
-    meanROI = str(round((100*sum(dpROI_per_game)/num_games), 4)) + '%'
-    sigma = str(round(100*np.std(dpROI_per_game), 4)) + '%'
+    meanROI = str(round((100*dpROI_stats.get_mean()), 4)) + '%'
+    sigma = str(round(100*dpROI_stats.get_std(), 4)) + '%'
     print('Don\'t Pass:',  'Mean ROI =', meanROI, 'Std. Dev. =', sigma)
 
 # Structure of craps_sim simulation:
@@ -89,3 +100,9 @@ def craps_sim(hands_per_game, num_games):
 craps_sim(20, 10)
 craps_sim(1000000, 10)
 craps_sim(20, 1000000)
+# Same simulations with every hand played as arrays
+craps_sim(20, 10, 'numpy')
+craps_sim(1000000, 10, 'numpy')
+craps_sim(20, 1000000, 'numpy')
+# craps_demo in parallel_demos.py plays games like these in a pool of
+# processes (each worker would re-run this whole script)
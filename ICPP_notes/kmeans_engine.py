@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Array-based k-means engine
+Used by ICPP Chapter 23 to cluster examples held in one (n, d) array
+@author: Daniel J. Vera, Ph.D.
+"""
+import concurrent.futures
+import multiprocessing
+import time
+import numpy as np
+
+def sq_distances(points, centroids):
+    """Assumes points an (n, d) array, centroids a (k, d) array
+       Returns the (n, k) array of squared Euclidean distances"""
+    sq_dists = (np.einsum('ij,ij->i', points, points)[:, None]
+                - 2.0 * points @ centroids.T
+                + np.einsum('ij,ij->i', centroids, centroids)[None, :])
+    return np.maximum(sq_dists, 0.0) # remove tiny negative round-off
+
+def assign(points, centroids, block_size=65536):
+    """Assumes points an (n, d) array, centroids a (k, d) array
+       Works through points block_size rows at a time to bound memory.
+       Returns an array of the index of the closest centroid to each
+       point and an array of the squared distances to it"""
+    n = len(points)
+    labels = np.empty(n, dtype=np.intp)
+    min_sq_dists = np.empty(n)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sq_dists = sq_distances(points[start:stop], centroids)
+        labels[start:stop] = np.argmin(sq_dists, axis=1)
+        min_sq_dists[start:stop] = sq_dists[np.arange(stop - start),
+                                            labels[start:stop]]
+    return labels, min_sq_dists
+
+def update_centroids(points, labels, k):
+    """Assumes labels an array of ints in range(k), one per point
+       Returns a (k, d) array of the mean of the points with each label
+       and an array of the number of points with each label"""
+    counts = np.bincount(labels, minlength=k)
+    sums = np.empty((k, points.shape[1]))
+    for j in range(points.shape[1]):
+        sums[:, j] = np.bincount(labels, weights=points[:, j], minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts[:, None], counts
+
+def kmeans_plus_plus(points, k, rng):
+    """Assumes points an (n, d) float array, k an int <= n, rng a NumPy
+       Generator
+       Chooses the first centroid uniformly, then each further one with
+       probability proportional to its squared distance from the
+       nearest centroid already chosen (k-means++ seeding).
+       Returns a list of k row indices"""
+    indices = [int(rng.integers(len(points)))]
+    min_sq_dists = sq_distances(points, points[indices])[:, 0]
+    for i in range(1, k):
+        total = min_sq_dists.sum()
+        if total == 0.0: # fewer than k distinct points
+            raise ValueError('Too few distinct points')
+        index = int(np.searchsorted(np.cumsum(min_sq_dists),
+                                    rng.random() * total, side='right'))
+        index = min(index, len(points) - 1)
+        indices.append(index)
+        min_sq_dists = np.minimum(min_sq_dists,
+                                  sq_distances(points,
+                                               points[[index]])[:, 0])
+    return indices
+
+def initial_centroids(points, k, rng, init='random'):
+    """Assumes init is 'random' or 'kmeans++'
+       Returns a list of k distinct row indices of points"""
+    if init == 'random':
+        return list(rng.choice(len(points), k, replace=False))
+    elif init == 'kmeans++':
+        return kmeans_plus_plus(points, k, rng)
+    raise ValueError('Unknown init ' + str(init))
+
+def fill_empty_clusters(points, labels, centroids):
+    """Assumes labels an int array of the cluster of each row of points,
+       centroids the (k, d) array of centroids
+       For each cluster with no points, moves the point farthest from
+       its own centroid (one whose cluster keeps other points) into that
+       cluster and puts the cluster's centroid on it. Changes labels
+       and centroids in place"""
+    k = len(centroids)
+    counts = np.bincount(labels, minlength=k)
+    if np.all(counts > 0):
+        return
+    sq_dists = ((points - centroids[labels])**2).sum(axis=1)
+    for c in np.nonzero(counts == 0)[0]:
+        farthest = np.argmax(sq_dists)
+        while counts[labels[farthest]] < 2:
+            sq_dists[farthest] = -1.0
+            farthest = np.argmax(sq_dists)
+        counts[labels[farthest]] -= 1
+        counts[c] = 1
+        labels[farthest] = c
+        centroids[c] = points[farthest]
+        sq_dists[farthest] = -1.0
+
+def kmeans_arrays(points, k, initial_indices, max_iters=None,
+                  verbose=False, abandon_above=None, tol=0.0,
+                  reseed_empty=False):
+    """Assumes points an (n, d) float array, initial_indices a sequence
+       of k distinct row indices used as the initial centroids,
+       abandon_above None or a function of no arguments returning a
+       float, tol a float >= 0
+       Same algorithm as kmeans in Chapter 23: iterates until no point
+       changes cluster or no centroid moves more than tol. If a cluster
+       loses all of its points, raises ValueError('Empty Cluster'), or
+       if reseed_empty is True moves its centroid to the point farthest
+       from its own centroid and carries on, or raises
+       ValueError('Too few distinct points') if every point already sits
+       on its centroid. If the sum of squared distances of an iteration
+       exceeds abandon_above() and fell by less than 1% of the gap in
+       that iteration, stops and returns None labels.
+       Returns an array of the cluster index of each point, the (k, d)
+       array of centroids, and the number of iterations"""
+    centroids = points[list(initial_indices)].astype(np.float64)
+    labels = None
+    num_iterations = 0
+    prev_sse = float('inf')
+    while max_iters is None or num_iterations < max_iters:
+        num_iterations += 1
+        new_labels, min_sq_dists = assign(points, centroids)
+        converged = labels is not None and np.array_equal(labels,
+                                                          new_labels)
+        labels = new_labels
+        if abandon_above is not None:
+            sse = min_sq_dists.sum()
+            gap = sse - abandon_above()
+            if gap > 0 and prev_sse - sse < 0.01 * gap:
+                return None, centroids, num_iterations
+            prev_sse = sse
+        old_centroids = centroids
+        centroids, counts = update_centroids(points, labels, k)
+        for c in np.nonzero(counts == 0)[0]:
+            if not reseed_empty:
+                raise ValueError('Empty Cluster')
+            farthest = np.argmax(min_sq_dists)
+            if min_sq_dists[farthest] == 0.0: # every point is on a centroid
+                raise ValueError('Too few distinct points')
+            centroids[c] = points[farthest]
+            min_sq_dists[farthest] = 0.0 # don't reuse for another
+            converged = False
+        if not converged and tol > 0.0:
+            shifts = np.sqrt(((centroids - old_centroids)**2).sum(axis=1))
+            converged = np.all(shifts <= tol)
+        if verbose:
+            print('Iteration #' + str(num_iterations))
+        if converged:
+            break
+    return labels, centroids, num_iterations
+
+def hamerly_kmeans(points, k, initial_indices, max_iters=None,
+                   verbose=False, reseed_empty=False):
+    """Assumes points an (n, d) float array, initial_indices a sequence
+       of k distinct row indices used as the initial centroids
+       Same clustering as kmeans_arrays, but keeps for each point an
+       upper bound on the distance to its own centroid and a lower
+       bound on the distance to any other (Hamerly's algorithm). A
+       point's distances are only computed when the bounds, or half the
+       distance from its centroid to the nearest other centroid, cannot
+       rule out a change of cluster. Empty clusters are handled as in
+       kmeans_arrays.
+       Returns an array of the cluster index of each point, the (k, d)
+       array of centroids, the number of iterations, and a list with
+       the number of point-to-centroid distances skipped (out of n * k)
+       in each iteration"""
+    n = len(points)
+    centroids = points[list(initial_indices)].astype(np.float64)
+    # First iteration computes every distance
+    dists = np.sqrt(sq_distances(points, centroids))
+    labels = np.argmin(dists, axis=1)
+    rows = np.arange(n)
+    upper = dists[rows, labels]
+    dists[rows, labels] = np.inf
+    lower = dists.min(axis=1)
+    skipped = [0]
+    num_iterations = 1
+    changed = True
+    while True:
+        old_centroids = centroids
+        centroids, counts = update_centroids(points, labels, k)
+        if np.any(counts == 0):
+            if not reseed_empty:
+                raise ValueError('Empty Cluster')
+            # the same choice as kmeans_arrays, from exact distances to
+            # the centroids the points were assigned to; the bounds are
+            # loosened below by how far each centroid moved, so they stay
+            # valid after the jump
+            sq_dists = ((points - old_centroids[labels])**2).sum(axis=1)
+            for c in np.nonzero(counts == 0)[0]:
+                farthest = np.argmax(sq_dists)
+                if sq_dists[farthest] == 0.0:
+                    raise ValueError('Too few distinct points')
+                centroids[c] = points[farthest]
+                sq_dists[farthest] = 0.0
+            changed = True
+        if verbose:
+            print('Iteration #' + str(num_iterations) + ',', skipped[-1],
+                  'of', n * k, 'distances skipped')
+        if not changed or num_iterations == max_iters:
+            break
+        num_iterations += 1
+        # Loosen bounds by how far the centroids moved
+        moved = np.sqrt(((centroids - old_centroids)**2).sum(axis=1))
+        upper += moved[labels]
+        if k > 1:
+            order = np.argsort(moved)
+            lower -= np.where(labels == order[-1], moved[order[-2]],
+                              moved[order[-1]])
+        centroid_dists = np.sqrt(sq_distances(centroids, centroids))
+        np.fill_diagonal(centroid_dists, np.inf)
+        bound = np.maximum(0.5 * centroid_dists.min(axis=1)[labels], lower)
+        # Tighten the upper bound of points that might change cluster
+        tighten = np.nonzero(upper > bound)[0]
+        diffs = points[tighten] - centroids[labels[tighten]]
+        upper[tighten] = np.sqrt((diffs**2).sum(axis=1))
+        # Only points still in doubt need distances to every centroid
+        check = tighten[upper[tighten] > bound[tighten]]
+        dists = np.sqrt(sq_distances(points[check], centroids))
+        new_labels = np.argmin(dists, axis=1)
+        changed = np.any(new_labels != labels[check])
+        labels[check] = new_labels
+        check_rows = np.arange(len(check))
+        upper[check] = dists[check_rows, new_labels]
+        dists[check_rows, new_labels] = np.inf
+        lower[check] = dists.min(axis=1)
+        skipped.append(n * k - len(tighten) - len(check) * k)
+    return labels, centroids, num_iterations, skipped
+
+def minibatch_kmeans(points, k, initial_indices, rng, batch_size=1024,
+                     tol=1e-4, max_iters=100, verbose=False):
+    """Assumes points an (n, d) float array, initial_indices a sequence
+       of k distinct row indices, rng a NumPy Generator
+       Each iteration assigns a random batch of batch_size points and
+       moves each centroid toward the mean of its batch points with a
+       step of (batch points) / (points seen so far) for that centroid,
+       so an iteration costs O(batch_size * k) whatever the size of
+       points. Stops after max_iters iterations or once no centroid
+       moves more than tol. A centroid with no points keeps its place,
+       and if no point is closest to a centroid at the end,
+       fill_empty_clusters gives it one, so empty clusters never occur.
+       Returns an array of the closest centroid to each point, the
+       (k, d) array of centroids, and the number of iterations"""
+    centroids = points[list(initial_indices)].astype(np.float64)
+    seen = np.zeros(k)
+    batch_size = min(batch_size, len(points))
+    num_iterations = 0
+    while num_iterations < max_iters:
+        num_iterations += 1
+        batch = points[rng.choice(len(points), batch_size, replace=False)]
+        batch_labels, batch_sq_dists = assign(batch, centroids)
+        batch_means, counts = update_centroids(batch, batch_labels, k)
+        seen += counts
+        moved = counts > 0
+        rate = (counts[moved] / seen[moved])[:, None]
+        step = rate * (batch_means[moved] - centroids[moved])
+        centroids[moved] += step
+        if verbose:
+            print('Iteration #' + str(num_iterations))
+        if np.sqrt((step**2).sum(axis=1)).max() <= tol:
+            break
+    labels = assign(points, centroids)[0]
+    fill_empty_clusters(points, labels, centroids)
+    return labels, centroids, num_iterations
+
+_trial_state = {}
+
+def _init_trial_worker(points, k, max_iters, best, init='random',
+                       reseed_empty=True):
+    _trial_state['points'] = points
+    _trial_state['k'] = k
+    _trial_state['max_iters'] = max_iters
+    _trial_state['best'] = best
+    _trial_state['init'] = init
+    _trial_state['reseed_empty'] = reseed_empty
+
+def _run_trial(trial, seed, abandon):
+    """Runs one k-means trial on the points given to _init_trial_worker
+       Returns a dict describing the trial"""
+    points, k = _trial_state['points'], _trial_state['k']
+    best = _trial_state['best']
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    result = {'trial': trial, 'labels': None, 'dissimilarity': None}
+    try:
+        initial_indices = initial_centroids(points, k, rng,
+                                            _trial_state['init'])
+        labels, centroids, num_iterations =\
+                kmeans_arrays(points, k, initial_indices,
+                              _trial_state['max_iters'],
+                              abandon_above=(lambda: best.value)
+                              if abandon else None,
+                              reseed_empty=_trial_state['reseed_empty'])
+    except ValueError as e: # e.g. 'Empty Cluster'
+        result['status'], result['iterations'] = str(e), None
+    else:
+        result['iterations'] = num_iterations
+        if labels is None:
+            result['status'] = 'abandoned'
+        else:
+            result['status'] = 'converged'
+            result['labels'] = labels
+            result['dissimilarity'] =\
+                    float(assign(points, centroids)[1].sum())
+            with best.get_lock():
+                best.value = min(best.value, result['dissimilarity'])
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def try_kmeans_arrays(points, k, num_trials, seed=None, num_workers=None,
+                      abandon=True, max_iters=None, init='random',
+                      reseed_empty=True):
+    """Assumes points an (n, d) float array, num_trials an int > 0,
+       num_workers None (one per core) or an int > 0
+       Runs num_trials k-means trials in a process pool. Trial i draws
+       its initial centroids from child i of SeedSequence(seed), so each
+       trial is reproducible on its own. When abandon is True, a trial
+       is abandoned once its dissimilarity exceeds the best final
+       dissimilarity found so far and is no longer falling quickly
+       enough to close the gap (see kmeans_arrays). This is a
+       heuristic: it can occasionally discard a trial that would have
+       ended as the best, and which trials are abandoned depends on
+       the order trials finish in. With reseed_empty True (see
+       kmeans_arrays) no trial fails with an empty cluster. A trial
+       that raises ValueError is reported, with the error message as
+       its status, rather than retried.
+       Returns the result dict of the best trial (None if no trial
+       converged) and a list of the result dicts of all trials, each
+       with keys trial, status, iterations, seconds, dissimilarity and
+       labels. init is passed to initial_centroids"""
+    best = multiprocessing.Value('d', float('inf'))
+    children = np.random.SeedSequence(seed).spawn(num_trials)
+    if num_workers == 1:
+        _init_trial_worker(points, k, max_iters, best, init, reseed_empty)
+        results = [_run_trial(i, children[i], abandon)
+                   for i in range(num_trials)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                num_workers, initializer=_init_trial_worker,
+                initargs=(points, k, max_iters, best, init,
+                          reseed_empty)) as pool:
+            futures = [pool.submit(_run_trial, i, children[i], abandon)
+                       for i in range(num_trials)]
+            results = [f.result() for f in futures]
+    converged = [r for r in results if r['status'] == 'converged']
+    if converged == []:
+        return None, results
+    return min(converged, key=lambda r: r['dissimilarity']), results
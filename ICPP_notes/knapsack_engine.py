@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Array-based knapsack solvers
+Used by the greedy algorithms of ICPP Chapter 12, and by Chapter 13 for
+knapsacks too big for the recursive versions
+@author: Daniel J. Vera, Ph.D.
+"""
+import bisect
+import numpy as np
+
+def item_arrays(items):
+    """Assumes items a list of Items
+       Returns arrays of their values and weights"""
+    return (np.array([item.get_value() for item in items]),
+            np.array([item.get_weight() for item in items]))
+
+def dp_knapsack(values, weights, capacity):
+    """Assumes values a sequence of numbers >= 0, weights an equal-length
+       sequence of ints >= 0, capacity an int >= 0
+       Fills the table of best values bottom up, one item at a time,
+       keeping only the current row (best value for each capacity
+       0..capacity) and one bit per item and capacity saying whether
+       the item was taken. The bits are enough to recover the items.
+       Returns a tuple of the best total value and a list of the indices
+       of the items taken, last item first"""
+    values = np.asarray(values)
+    weights = np.asarray(weights)
+    if len(weights) > 0 and (np.any(weights != np.round(weights))
+                             or np.any(weights < 0)):
+        raise ValueError('dp_knapsack needs whole, non-negative weights')
+    weights = weights.astype(np.int64)
+    capacity = int(capacity)
+    dtype = np.int64 if values.dtype.kind in 'iub' else np.float64
+    best = np.zeros(capacity + 1, dtype=dtype)
+    took = np.zeros((len(values), (capacity + 8) // 8), dtype=np.uint8)
+    took_row = np.zeros(capacity + 1, dtype=bool)
+    for i in range(len(values)):
+        w = weights[i]
+        if w > capacity:
+            continue
+        # best[c - w] + value still holds the previous row's values,
+        # because the right-hand side is computed before assignment
+        with_item = best[:capacity + 1 - w] + values[i]
+        took_row[:] = False
+        took_row[w:] = with_item > best[w:]
+        best[w:] = np.maximum(with_item, best[w:])
+        took[i] = np.packbits(took_row)
+    taken = []
+    avail = capacity
+    for i in range(len(values) - 1, -1, -1):
+        if took[i, avail >> 3] >> (7 - (avail & 7)) & 1:
+            taken.append(i)
+            avail -= weights[i]
+    return best[capacity].item(), taken
+
+def branch_and_bound_knapsack(values, weights, capacity):
+    """Assumes values and weights equal-length sequences of numbers >= 0,
+       which may be floats, capacity a number >= 0
+       Searches the same take/don't take tree as max_val in Chapter 13,
+       depth first and taking first, with the items in order of density
+       (value / weight). A subtree is pruned when the greedy fractional
+       knapsack of its remaining items, an upper bound on anything the
+       subtree holds, cannot beat the best solution found so far.
+       Returns a tuple of the best total value, a list of the indices of
+       the items taken, and the number of tree nodes explored (the full
+       tree has 2**(len(values) + 1) - 1)"""
+    values = np.asarray(values).tolist()
+    weights = np.asarray(weights).tolist()
+    n = len(values)
+    order = sorted(range(n), reverse=True,
+                   key=lambda i: values[i] / weights[i] if weights[i] > 0
+                                 else float('inf'))
+    vals = [values[i] for i in order]
+    wts = [weights[i] for i in order]
+    cum_v, cum_w = [0], [0]
+    for i in range(n):
+        cum_v.append(cum_v[-1] + vals[i])
+        cum_w.append(cum_w[-1] + wts[i])
+
+    def bound(i, avail, val):
+        # items i..j-1 fit whole, then a fraction of item j
+        limit = cum_w[i] + avail
+        j = bisect.bisect_right(cum_w, limit) - 1
+        total = val + cum_v[j] - cum_v[i]
+        if j < n:
+            total += vals[j] * (limit - cum_w[j]) / wts[j]
+        return total
+
+    best_val, best_path = 0, None
+    nodes = 0
+    # each entry is (next item, capacity left, value so far, items taken
+    # as a linked list of (item, rest) pairs)
+    stack = [(0, capacity, 0, None)]
+    while stack:
+        i, avail, val, path = stack.pop()
+        nodes += 1
+        if val > best_val:
+            best_val, best_path = val, path
+        if i == n or bound(i, avail, val) <= best_val:
+            continue
+        stack.append((i + 1, avail, val, path))
+        if wts[i] <= avail:
+            stack.append((i + 1, avail - wts[i], val + vals[i], (i, path)))
+    taken = []
+    while best_path is not None:
+        taken.append(order[best_path[0]])
+        best_path = best_path[1]
+    return best_val, taken, nodes
+
+
+class GreedyKnapsack(object):
+    """The greedy algorithm of Chapter 12 over arrays of item values and
+       weights, with the three keys (value, weight_inverse, density)
+       computed once, and each key's order sorted at most once"""
+    KEYS = ('value', 'weight_inverse', 'density')
+
+    def __init__(self, values, weights):
+        """Assumes values and weights equal-length sequences of numbers,
+           weights > 0"""
+        self.values = np.asarray(values, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.keys = {'value': self.values,
+                     'weight_inverse': 1.0 / self.weights,
+                     'density': self.values / self.weights}
+        self.orders = {}
+        self.value_list = self.values.tolist() # faster to index one by one
+        self.weight_list = self.weights.tolist()
+        self.min_weight = self.weights.min().item() if len(self.weights) > 0\
+                          else 0.0
+
+    def get_order(self, key, count=None):
+        """Returns the indices of the count items (all of them if count
+           is None) that greedy would consider first: by key, largest
+           first, ties in their original order, as sorted(...,
+           reverse=True) gives"""
+        if key in self.orders:
+            return self.orders[key][:count]
+        keys = self.keys[key]
+        if count is None or count >= len(keys):
+            self.orders[key] = np.lexsort((np.arange(len(keys)), -keys))
+            return self.orders[key]
+        # every item tied with the count-th largest key is kept, so the
+        # order of the first count items is the same as in a full sort
+        kth = np.partition(keys, len(keys) - count)[len(keys) - count]
+        top = np.nonzero(keys >= kth)[0]
+        return top[np.lexsort((top, -keys[top]))][:count]
+
+    def select(self, max_weight, key, first_count=1024):
+        """Assumes max_weight >= 0, key one of KEYS
+           Takes items in key order while they fit, as greedy does, but
+           stops as soon as not even the lightest item fits. The items
+           are ordered first_count at a time, doubling the count each
+           time it runs out, so a small knapsack among many items never
+           sorts them all.
+           Returns a tuple of the list of indices of the items taken and
+           their total value"""
+        taken = []
+        total_value, total_weight = 0.0, 0.0
+        scanned = 0
+        count = first_count
+        while scanned < len(self.values):
+            order = self.get_order(key, count).tolist()
+            for i in order[scanned:]:
+                if total_weight + self.min_weight > max_weight:
+                    return (taken, total_value)
+                if total_weight + self.weight_list[i] <= max_weight:
+                    taken.append(i)
+                    total_weight += self.weight_list[i]
+                    total_value += self.value_list[i]
+            scanned = len(order)
+            count *= 2
+        return (taken, total_value)
+
+    def curve(self, capacities, key):
+        """Assumes capacities a sequence of numbers >= 0, key one of KEYS
+           Runs greedy for every capacity at once: one pass over the
+           items in key order, each item added to the knapsacks it fits
+           in, ending once no remaining item fits any knapsack.
+           Returns an array of the total value taken for each capacity"""
+        totals_weight = np.zeros(len(capacities))
+        totals_value = np.zeros(len(capacities))
+        capacities = np.asarray(capacities, dtype=float)
+        order = self.get_order(key)
+        # lightest of the items from position i on, in key order
+        rest_min = np.minimum.accumulate(self.weights[order][::-1])[::-1]
+        for pos in range(len(order)):
+            if np.all(totals_weight + rest_min[pos] > capacities):
+                break
+            i = order[pos]
+            fits = totals_weight + self.weights[i] <= capacities
+            totals_weight[fits] += self.weights[i]
+            totals_value[fits] += self.values[i]
+        return totals_value
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Array-based k-nearest neighbor engine
+Used by ICPP Chapter 24 in place of the linear scan in find_k_nearest
+@author: Daniel J. Vera, Ph.D.
+"""
+import concurrent.futures
+import numpy as np
+import scipy.spatial
+import minkowski
+
+def pack_examples(examples):
+    """Assumes examples a non-empty list of objects with get_features
+       and get_label methods
+       Returns a tuple of a contiguous (n, d) float array of the feature
+       vectors and an array of the labels"""
+    features = np.ascontiguousarray([e.get_features() for e in examples],
+                                    dtype=np.float64)
+    labels = np.array([e.get_label() for e in examples])
+    return features, labels
+
+def brute_force_nearest(train_feats, query_feats, k, block_size=None,
+                        max_bytes=2**26):
+    """Assumes train_feats an (n, d) array, query_feats an (m, d) array,
+       k an int with 0 < k <= n
+       Computes Euclidean distances (with minkowski.pairwise_minkowski)
+       a block of queries at a time, so memory use is bounded by
+       max_bytes, and selects the k smallest with argpartition.
+       Returns (m, k) arrays of indices and distances, nearest first"""
+    n, d = train_feats.shape
+    m = len(query_feats)
+    if block_size is None:
+        block_size = max(1, max_bytes // (8 * n))
+    indices = np.empty((m, k), dtype=np.intp)
+    distances = np.empty((m, k))
+    rows = np.arange(min(block_size, m))[:, None]
+    for start in range(0, m, block_size):
+        stop = min(start + block_size, m)
+        block_dists = minkowski.pairwise_minkowski(query_feats[start:stop],
+                                                   train_feats, 2)
+        if k < n:
+            nearest = np.argpartition(block_dists, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(n), (stop - start, n))
+        near_dists = block_dists[rows[:stop - start], nearest]
+        order = np.argsort(near_dists, axis=1, kind='stable')
+        indices[start:stop] = nearest[rows[:stop - start], order]
+        distances[start:stop] = near_dists[rows[:stop - start], order]
+    return indices, distances
+
+def kdtree_nearest(train_feats, query_feats, k, tree=None):
+    """Assumes train_feats an (n, d) array, query_feats an (m, d) array,
+       k an int with 0 < k <= n, tree an optional prebuilt cKDTree
+       over train_feats
+       Returns (m, k) arrays of indices and distances, nearest first"""
+    if tree is None:
+        tree = scipy.spatial.cKDTree(train_feats)
+    distances, indices = tree.query(query_feats, k)
+    if k == 1: # query drops the k axis when k is 1
+        distances, indices = distances[:, None], indices[:, None]
+    return indices, distances
+
+def k_nearest(train_feats, query_feats, k, backend='kdtree'):
+    """Assumes backend is 'kdtree' or 'brute'
+       Returns (m, k) arrays of indices and distances of the k nearest
+       training examples to each query, nearest first"""
+    if k > len(train_feats):
+        raise ValueError('k larger than training set')
+    if backend == 'kdtree':
+        return kdtree_nearest(train_feats, query_feats, k)
+    elif backend == 'brute':
+        return brute_force_nearest(train_feats, query_feats, k)
+    raise ValueError('Unknown backend ' + str(backend))
+
+def confusion_counts(predicted, actual):
+    """Assumes predicted and actual are equal-length boolean arrays
+       Returns number of true positives, false positives,
+       true negatives, and false negatives"""
+    true_pos = int(np.count_nonzero(predicted & actual))
+    false_pos = int(np.count_nonzero(predicted & ~actual))
+    true_neg = int(np.count_nonzero(~predicted & ~actual))
+    false_neg = int(np.count_nonzero(~predicted & actual))
+    return true_pos, false_pos, true_neg, false_neg
+
+def knn_classify_arrays(train_feats, train_labels, test_feats, test_labels,
+                        label, k, backend='kdtree'):
+    """Assumes the feature arguments are (n, d) arrays and the label
+       arguments arrays of labels
+       Classifies the whole test set in one batch by majority vote of
+       the k nearest training examples.
+       Returns number of true positives, false positives,
+       true negatives, and false negatives"""
+    nearest, distances = k_nearest(train_feats, test_feats, k, backend)
+    num_match = (train_labels[nearest] == label).sum(axis=1)
+    return confusion_counts(num_match > k // 2, test_labels == label)
+
+def knn_classify(training, test_set, label, k, backend='kdtree'):
+    """Assumes training and test_set are lists of examples, k an int
+       Same result as k_nearest_classify in chapter 24, up to how ties
+       between equally distant neighbors are broken.
+       Returns number of true positives, false positives,
+       true negatives, and false negatives"""
+    train_feats, train_labels = pack_examples(training)
+    test_feats, test_labels = pack_examples(test_set)
+    return knn_classify_arrays(train_feats, train_labels, test_feats,
+                               test_labels, label, k, backend)
+
+def fold_accuracies(train_feats, train_labels, label, ks, seed,
+                    backend='kdtree'):
+    """Assumes ks a sorted sequence of odd ints, seed an int or
+       SeedSequence
+       Randomly splits the examples 80/20, finds the max(ks) nearest
+       neighbors of each test example once, and takes the vote for
+       every k in ks from the first k neighbors of that list.
+       Returns a list of the accuracy for each k in ks"""
+    rng = np.random.default_rng(seed)
+    n = len(train_feats)
+    order = rng.permutation(n)
+    test, train = order[:n // 5], order[n // 5:]
+    nearest, distances = k_nearest(train_feats[train], train_feats[test],
+                                   ks[-1], backend)
+    matches = train_labels[train][nearest] == label
+    votes = np.cumsum(matches, axis=1) # votes[:, k-1] counts k nearest
+    actual = train_labels[test] == label
+    accuracies = []
+    for k in ks:
+        predicted = votes[:, k - 1] > k // 2
+        accuracies.append(np.count_nonzero(predicted == actual) / len(test))
+    return accuracies
+
+def _fold_task(args):
+    return fold_accuracies(*args)
+
+def cross_validate_k(train_feats, train_labels, label, ks, num_folds,
+                     seed=None, backend='kdtree', num_workers=None):
+    """Assumes ks a sequence of odd ints, num_folds an int > 0,
+       num_workers None (one per core) or an int > 0
+       Runs the folds in a process pool. Each fold gets its own child
+       of SeedSequence(seed), so for a given seed the result does not
+       depend on num_workers.
+       Returns an array of the average accuracy for each k in ks"""
+    ks = sorted(ks)
+    children = np.random.SeedSequence(seed).spawn(num_folds)
+    tasks = [(train_feats, train_labels, label, ks, child, backend)
+             for child in children]
+    if num_workers == 1:
+        results = list(map(_fold_task, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as pool:
+            results = list(pool.map(_fold_task, tasks))
+    return np.mean(results, axis=0)
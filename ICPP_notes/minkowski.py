@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized Minkowski distances
+Shared by ICPP Chapters 22, 23 and 24
+@author: Daniel J. Vera, Ph.D.
+"""
+import numpy as np
+
+def as_float_array(vals, dtype=None):
+    """Returns vals as a float32 or float64 array; float32 is kept only
+       if vals already has that dtype or dtype asks for it"""
+    if dtype is None:
+        dtype = np.float32 if getattr(vals, 'dtype', None) == np.float32\
+                else np.float64
+    return np.asarray(vals, dtype=dtype)
+
+def reduce_diffs(diffs, p):
+    """Assumes diffs an array whose last axis holds the differences
+       between two vectors, p a number >= 1 or np.inf
+       Returns the Minkowski norm of order p along the last axis"""
+    if p == 2:
+        return np.sqrt(np.einsum('...i,...i->...', diffs, diffs))
+    diffs = np.abs(diffs)
+    if p == 1:
+        return diffs.sum(axis=-1)
+    if p == np.inf:
+        return diffs.max(axis=-1)
+    return (diffs**p).sum(axis=-1)**(1 / p)
+
+def minkowski_dist(v1, v2, p):
+    """Assumes v1 and v2 are equal-length arrays of numbers
+       Returns Minkowski distance of order p between v1 and v2"""
+    if len(v1) > 64:
+        diffs = as_float_array(v1) - as_float_array(v2)
+        return float(reduce_diffs(diffs, p))
+    # For short vectors a plain loop is several times faster than
+    # building arrays, and this is called once per pair in the chapters
+    if p == np.inf:
+        return float(max([abs(v1[i] - v2[i]) for i in range(len(v1))],
+                         default=0.0))
+    dist = 0.0
+    for i in range(len(v1)):
+        dist += abs(v1[i] - v2[i])**p
+    return float(dist**(1 / p))
+
+def minkowski_to_many(v, vecs, p, dtype=None):
+    """Assumes v a vector of length d, vecs an (n, d) array
+       Returns an array of the n distances of order p from v to each
+       row of vecs"""
+    vecs = as_float_array(vecs, dtype)
+    return reduce_diffs(vecs - as_float_array(v, vecs.dtype), p)
+
+def pairwise_minkowski(vecs1, vecs2, p, dtype=None, max_bytes=2**26):
+    """Assumes vecs1 an (n, d) array, vecs2 an (m, d) array
+       Computes the distances a block of rows of vecs1 at a time, so
+       the temporary arrays stay under about max_bytes.
+       Returns the (n, m) array whose (i, j) entry is the distance of
+       order p between row i of vecs1 and row j of vecs2"""
+    vecs1 = as_float_array(vecs1, dtype)
+    vecs2 = as_float_array(vecs2, vecs1.dtype)
+    n, d = vecs1.shape
+    m = len(vecs2)
+    result = np.empty((n, m), dtype=vecs1.dtype)
+    if p == 2:
+        # |a - b|**2 = |a|**2 - 2 a.b + |b|**2 needs no (n, m, d) array
+        sq_norms2 = np.einsum('ij,ij->i', vecs2, vecs2)
+        block_size = max(1, max_bytes // (vecs1.itemsize * max(m, 1)))
+    else:
+        block_size = max(1, max_bytes // (vecs1.itemsize * max(m * d, 1)))
+    for start in range(0, n, block_size):
+        block = vecs1[start:start + block_size]
+        if p == 2:
+            sq_dists = np.einsum('ij,ij->i', block, block)[:, None]\
+                       - 2 * block @ vecs2.T + sq_norms2[None, :]
+            result[start:start + block_size] =\
+                np.sqrt(np.maximum(sq_dists, 0)) # clip round-off
+        else:
+            result[start:start + block_size] =\
+                reduce_diffs(block[:, None, :] - vecs2[None, :, :], p)
+    return result
+
+def condensed_offset(i, n):
+    """Returns the position in a condensed distance array of n vectors
+       of the distance between vectors i and i + 1"""
+    return i * n - i * (i + 1) // 2
+
+def condensed_blocks(vecs, p, dtype=None, max_bytes=2**26):
+    """Assumes vecs an (n, d) array
+       Generates (offset, dists) pairs, where dists holds the distances
+       of order p between each pair i < j of rows of a block of rows,
+       in the order of a condensed distance array, and offset is where
+       they belong in that array. Only the upper triangle is computed,
+       apart from the small triangle within each block."""
+    vecs = as_float_array(vecs, dtype)
+    n = len(vecs)
+    start = 0
+    while start < n - 1:
+        block_size = max(1, max_bytes // (vecs.itemsize * (n - start)))
+        stop = min(start + block_size, n - 1)
+        dists = pairwise_minkowski(vecs[start:stop], vecs[start:], p,
+                                   max_bytes=max_bytes)
+        rows = np.arange(stop - start)[:, None]
+        cols = np.arange(n - start)[None, :]
+        yield condensed_offset(start, n), dists[cols > rows]
+        start = stop
+
+def condensed_distances(vecs, p=2, dtype=None, max_bytes=2**26):
+    """Assumes vecs an (n, d) array
+       Returns an array of the n * (n - 1) / 2 distances of order p
+       between rows i < j of vecs, in the order (0, 1), (0, 2), ...,
+       (0, n-1), (1, 2), ... (the same as scipy.spatial.distance.pdist)"""
+    vecs = as_float_array(vecs, dtype)
+    n = len(vecs)
+    result = np.empty(n * (n - 1) // 2, dtype=vecs.dtype)
+    for offset, dists in condensed_blocks(vecs, p, max_bytes=max_bytes):
+        result[offset:offset + len(dists)] = dists
+    return result
+
+def save_condensed_distances(vecs, filename, p=2, dtype=None,
+                             max_bytes=2**26):
+    """Assumes vecs an (n, d) array, filename a str ending in .npy
+       Writes the condensed distances of vecs to filename block by
+       block, so the full array never has to fit in memory.
+       Returns the result as a read-only memory map of filename"""
+    vecs = as_float_array(vecs, dtype)
+    n = len(vecs)
+    result = np.lib.format.open_memmap(filename, mode='w+',
+                                       dtype=vecs.dtype,
+                                       shape=(n * (n - 1) // 2,))
+    for offset, dists in condensed_blocks(vecs, p, max_bytes=max_bytes):
+        result[offset:offset + len(dists)] = dists
+    result.flush()
+    del result
+    return np.load(filename, mmap_mode='r')
+
+def condensed_to_square(condensed, n):
+    """Assumes condensed is the condensed distance array of n vectors
+       Returns the full symmetric (n, n) distance array"""
+    square = np.zeros((n, n), dtype=condensed.dtype)
+    rows, cols = np.triu_indices(n, 1)
+    square[rows, cols] = condensed
+    square[cols, rows] = condensed
+    return square
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Process-pool versions of demos from the chapter scripts
+Used by ICPP Chapters 14, 16, 23 and 24
+Under spawn or forkserver (the macOS and Windows default) every pool
+worker re-imports the main script before taking a task, which would
+re-run all of a chapter's demo cells. The chapters therefore run their
+demos with num_workers=1, and the pooled runs live here, where the top
+level only imports the engines.
+@author: Daniel J. Vera, Ph.D.
+"""
+import numpy as np
+import bm_data
+import craps_engine
+import kmeans_engine
+import knn_engine
+import walk_engine
+
+def walk_demo(walk_lengths=(10, 100, 1000, 10000, 100000), num_trials=1000,
+              seed=0, num_workers=None):
+    """Sweeps the walks of sim_all1(..., sweep=True) in Chapter 14 for
+       UsualDrunk, ColdDrunk and EWDrunk, in that order
+       Returns the array from walk_engine.sweep_mean_distances"""
+    step_dists = [
+        walk_engine.StepDistribution(((0, 1), (0, -1), (1, 0), (-1, 0))),
+        walk_engine.StepDistribution(((0.0, 1.0), (0.0, -2.0),
+                                      (1.0, 0.0), (-1.0, 0.0))),
+        walk_engine.StepDistribution(((1.0, 0.0), (-1.0, 0.0)))]
+    return walk_engine.sweep_mean_distances(step_dists, walk_lengths,
+                                            num_trials, seed, num_workers)
+
+def craps_demo(hands_per_game=20, num_games=1000000, seed=0,
+               num_workers=None):
+    """Plays the games of craps_sim(hands_per_game, num_games,
+       'parallel', seed) in Chapter 16
+       Returns RunningStats of the pass and don't pass ROI per game"""
+    return craps_engine.roi_stats(hands_per_game, num_games, seed,
+                                  num_workers)
+
+def kmeans_demo(n=50000, num_trials=40, seed=0, num_workers=None):
+    """Runs num_trials k-means trials, k = 2, on the two Gaussian
+       clusters of n points each that Chapter 23 builds with
+       gen_distribution(3, 1, 5, 1, n, 'A') and
+       gen_distribution(6, 1, 6, 1, n, 'B')
+       Returns the result of kmeans_engine.try_kmeans_arrays"""
+    rng = np.random.default_rng(seed)
+    points = np.concatenate((rng.normal((3, 5), 1, (n, 2)),
+                             rng.normal((6, 6), 1, (n, 2))))
+    return kmeans_engine.try_kmeans_arrays(points, 2, num_trials, seed,
+                                           num_workers)
+
+def knn_demo(filename='bm_results2012.txt', seed=0, num_workers=None):
+    """Cross-validates k-nearest neighbors on the (age, time) of the
+       runners in filename, as find_k_parallel in Chapter 24 does, with
+       a random 80% of the runners as training set
+       Returns a tuple of the ks and their average accuracies"""
+    columns = bm_data.load_bm_columns(filename)
+    feats = np.column_stack((columns['age'], columns['time']))\
+              .astype(np.float64)
+    labels = columns['gender_categories'][columns['gender']]
+    rng = np.random.default_rng(seed)
+    training = rng.permutation(len(labels))[len(labels) // 5:]
+    ks = range(1, 22, 2)
+    accuracies = knn_engine.cross_validate_k(feats[training],
+                                             labels[training], 'M', ks, 5,
+                                             seed, num_workers=num_workers)
+    return ks, accuracies
+
+if __name__ == '__main__':
+    walk_lengths = (10, 100, 1000, 10000, 100000)
+    means = walk_demo(walk_lengths)
+    for name, row in zip(('UsualDrunk', 'ColdDrunk', 'EWDrunk'), means):
+        for i in range(len(walk_lengths)):
+            print(name, 'random walk of', walk_lengths[i], 'steps')
+            print(' Mean =', round(row[i], 4))
+    pass_stats, dp_stats = craps_demo()
+    for name, stats in (('Pass:', pass_stats), ('Don\'t Pass:', dp_stats)):
+        print(name, 'Mean ROI =', str(round(100*stats.get_mean(), 4)) + '%',
+              'Std. Dev. =', str(round(100*stats.get_std(), 4)) + '%')
+    best, trials = kmeans_demo()
+    for t in trials:
+        print('Trial', t['trial'], t['status'] + ',',
+              t['iterations'], 'iterations,',
+              round(t['seconds'], 3), 'seconds')
+    if best is None:
+        print('No trial converged')
+    else:
+        print('Final result has dissimilarity',
+              round(best['dissimilarity'], 3))
+    ks, accuracies = knn_demo()
+    for k, accuracy in zip(ks, accuracies):
+        print('k =', k, 'accuracy =', round(accuracy, 4))
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Constant-memory summary statistics for simulation results
+Used by the simulations in ICPP Chapters 14, 15 and 16 and craps_sim.py
+@author: Daniel J. Vera, Ph.D.
+"""
+import numpy as np
+
+class RunningStats(object):
+    """Accumulates the count, mean, variance, minimum and maximum of a
+       stream of numbers without storing them (Welford's method), plus
+       optionally a uniform random sample of reservoir_size of them and
+       a histogram with num_bins equal bins over hist_range."""
+
+    def __init__(self, reservoir_size=0, hist_range=None, num_bins=10,
+                 seed=None):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_sq_diffs = 0.0 # sum of squared differences from mean
+        self.min, self.max = float('inf'), float('-inf')
+        self.reservoir_size = reservoir_size
+        self.reservoir = np.empty(0)
+        self.rng = np.random.default_rng(seed)
+        if hist_range is None:
+            self.bin_edges = None
+        else:
+            self.bin_edges = np.linspace(hist_range[0], hist_range[1],
+                                         num_bins + 1)
+            self.hist_counts = np.zeros(num_bins, dtype=np.int64)
+            self.below, self.above = 0, 0
+
+    def add(self, x):
+        """Assumes x a number"""
+        if self.reservoir_size > 0 or self.bin_edges is not None:
+            self.update_sample_and_hist(np.array([x], dtype=float))
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.sum_sq_diffs += delta * (x - self.mean)
+        self.min, self.max = min(self.min, x), max(self.max, x)
+
+    def add_many(self, vals):
+        """Assumes vals a sequence or array of numbers"""
+        vals = np.asarray(vals, dtype=float).ravel()
+        if len(vals) == 0:
+            return
+        self.update_sample_and_hist(vals)
+        self.combine(len(vals), vals.mean(),
+                     ((vals - vals.mean())**2).sum(), vals.min(),
+                     vals.max())
+
+    def combine(self, count, mean, sum_sq_diffs, min_val, max_val):
+        # Chan et al.'s formula for combining two sets of moments
+        total = self.count + count
+        delta = mean - self.mean
+        self.sum_sq_diffs += sum_sq_diffs\
+                             + delta**2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, float(min_val))
+        self.max = max(self.max, float(max_val))
+
+    def update_sample_and_hist(self, vals):
+        """Assumes vals an array of values not yet counted in self.count"""
+        if self.bin_edges is not None:
+            self.hist_counts += np.histogram(vals, self.bin_edges)[0]
+            self.below += int(np.count_nonzero(vals < self.bin_edges[0]))
+            self.above += int(np.count_nonzero(vals > self.bin_edges[-1]))
+        if self.reservoir_size > 0:
+            # Algorithm R: fill the reservoir, then the value numbered t
+            # replaces a random slot with probability reservoir_size / t
+            num_fill = max(0, min(self.reservoir_size - len(self.reservoir),
+                                  len(vals)))
+            self.reservoir = np.append(self.reservoir, vals[:num_fill])
+            rest = vals[num_fill:]
+            t = self.count + num_fill + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * t).astype(np.int64)
+            keep = slots < self.reservoir_size
+            # later values overwrite earlier ones, as if done one by one
+            self.reservoir[slots[keep]] = rest[keep]
+
+    def merge(self, other):
+        """Assumes other a RunningStats with the same reservoir_size and
+           histogram bins, e.g. one filled by a parallel worker
+           Adds the values summarized by other to self"""
+        if self.reservoir_size > 0:
+            k = min(self.reservoir_size, self.count + other.count)
+            if self.count > 0 and other.count > 0:
+                # how many of the k come from self, as if one reservoir
+                # had seen both streams
+                from_self = self.rng.hypergeometric(self.count,
+                                                    other.count, k)
+                self.reservoir = np.concatenate(
+                    (self.rng.permutation(self.reservoir)[:from_self],
+                     self.rng.permutation(other.reservoir)[:k - from_self]))
+            elif other.count > 0:
+                self.reservoir = other.reservoir.copy()
+        if self.bin_edges is not None:
+            self.hist_counts += other.hist_counts
+            self.below += other.below
+            self.above += other.above
+        if other.count > 0:
+            self.combine(other.count, other.mean, other.sum_sq_diffs,
+                         other.min, other.max)
+
+    def get_count(self):
+        return self.count
+
+    def get_mean(self):
+        return self.mean
+
+    def get_variance(self, ddof=0):
+        """ddof=0, like np.var, gives the population variance"""
+        if self.count <= ddof:
+            raise ValueError('variance needs more than ' + str(ddof)
+                             + ' values')
+        return self.sum_sq_diffs / (self.count - ddof)
+
+    def get_std(self, ddof=0):
+        return self.get_variance(ddof)**0.5
+
+    def get_min(self):
+        return self.min
+
+    def get_max(self):
+        return self.max
+
+    def get_sample(self):
+        return self.reservoir.copy()
+
+    def get_histogram(self):
+        """Returns the bin counts, the bin edges, and the number of
+           values below and above the histogram's range, or None if
+           there is no histogram (hist_range was None)"""
+        if self.bin_edges is None:
+            return None
+        return self.hist_counts.copy(), self.bin_edges, self.below,\
+               self.above
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Subset enumeration without materializing the powerset, and sums over
+subsets given as bitmasks
+Used by gen_powerset in ICPP Chapter 9 and the knapsack code of Chapter 12
+@author: Daniel J. Vera, Ph.D.
+"""
+import numpy as np
+
+def gray_code_flips(n):
+    """Assumes n an int >= 0
+       Generates, for k = 1, ..., 2**n - 1, the index of the one element
+       that enters or leaves the subset going from Gray code k - 1 to
+       Gray code k (the lowest set bit of k)"""
+    for k in range(1, 2**n):
+        yield (k & -k).bit_length() - 1
+
+def gen_subsets(L):
+    """Assumes L is a list
+       Generates every subset of L as a new list, in Gray code order
+       starting with [], so only one subset is held at a time"""
+    in_subset = [False] * len(L)
+    yield []
+    for j in gray_code_flips(len(L)):
+        in_subset[j] = not in_subset[j]
+        yield [L[i] for i in range(len(L)) if in_subset[i]]
+
+def gray_code_sums(values, weights):
+    """Assumes values and weights equal-length sequences of numbers
+       Generates (mask, total value, total weight) for every subset, in
+       Gray code order starting with the empty set, where bit j of the
+       int mask says whether element j is in the subset. Each step adds
+       or removes one element, so the totals are updated in O(1); with
+       float weights they can drift by a few rounding errors."""
+    mask, total_val, total_weight = 0, 0, 0
+    yield mask, total_val, total_weight
+    for j in gray_code_flips(len(values)):
+        bit = 1 << j
+        mask ^= bit
+        if mask & bit:
+            total_val += values[j]
+            total_weight += weights[j]
+        else:
+            total_val -= values[j]
+            total_weight -= weights[j]
+        yield mask, total_val, total_weight
+
+def mask_to_indices(mask):
+    """Assumes mask an int >= 0
+       Returns the list of the positions of the set bits of mask"""
+    indices = []
+    j = 0
+    while mask:
+        if mask & 1:
+            indices.append(j)
+        mask >>= 1
+        j += 1
+    return indices
+
+def gen_powerset_masks(L):
+    """Assumes L is a list
+       Returns the same subsets as gen_powerset, deciding membership by
+       testing bit j of the int mask rather than characters of a binary
+       string (element j goes with bit j, so the order differs)"""
+    return [[L[j] for j in range(len(L)) if mask >> j & 1]
+            for mask in range(2**len(L))]
+
+def byte_tables(values):
+    """Assumes values a sequence of at most 64 numbers
+       Returns a (ceil(len(values) / 8), 256) array whose row k, entry b
+       is the sum of values[8*k + j] over the set bits j of the byte b,
+       so the sum over a 64-bit mask takes one lookup per byte"""
+    values = np.asarray(values)
+    dtype = np.int64 if values.dtype.kind in 'iub' else np.float64
+    num_bytes = (len(values) + 7) // 8
+    padded = np.zeros(8 * num_bytes, dtype=dtype)
+    padded[:len(values)] = values
+    bits = (np.arange(256)[:, None] >> np.arange(8)[None, :]) & 1
+    return (bits.astype(dtype) @ padded.reshape(num_bytes, 8).T).T
+
+def subset_sums(masks, tables):
+    """Assumes masks a uint64 array, tables from byte_tables(values)
+       Returns the array of sums of values over the set bits of each
+       mask"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    sums = np.zeros(masks.shape, dtype=tables.dtype)
+    for k in range(len(tables)):
+        byte = (masks >> np.uint64(8 * k)) & np.uint64(255)
+        sums += tables[k][byte.astype(np.intp)]
+    return sums
+
+def subset_sizes(masks):
+    """Assumes masks a uint64 array
+       Returns the number of set bits of each mask"""
+    return subset_sums(masks, byte_tables(np.ones(64, dtype=np.int64)))
+
+def choose_best_masks(values, weights, max_weight, block_size=2**20):
+    """Assumes values and weights equal-length sequences of at most 64
+       numbers >= 0
+       Evaluates all 2**len(values) subsets as blocks of block_size
+       uint64 masks, summing each block's values and weights with
+       byte_tables in one vectorized pass.
+       Returns a tuple of the best total value of a subset whose weight
+       is at most max_weight and that subset's int mask"""
+    val_tables = byte_tables(values)
+    weight_tables = byte_tables(weights)
+    best_val, best_mask = 0, 0
+    for start in range(0, 2**len(values), block_size):
+        stop = min(start + block_size, 2**len(values))
+        masks = np.arange(start, stop, dtype=np.uint64)
+        vals = subset_sums(masks, val_tables)
+        fits = subset_sums(masks, weight_tables) <= max_weight
+        i = int(np.argmax(np.where(fits, vals, -1)))
+        if fits[i] and vals[i] > best_val:
+            best_val, best_mask = vals[i].item(), start + i
+    return best_val, best_mask
+
+def half_sums(values, weights):
+    """Assumes values and weights equal-length sequences of at most 63
+       numbers
+       Returns arrays of the total value, total weight and uint64 mask
+       of all 2**len(values) subsets, built by doubling: the subsets
+       without element j, then the same subsets with it"""
+    vals = np.zeros(1)
+    wts = np.zeros(1)
+    masks = np.zeros(1, dtype=np.uint64)
+    for j in range(len(values)):
+        vals = np.concatenate((vals, vals + values[j]))
+        wts = np.concatenate((wts, wts + weights[j]))
+        masks = np.concatenate((masks, masks | np.uint64(1 << j)))
+    return vals, wts, masks
+
+def meet_in_the_middle_knapsack(values, weights, capacity,
+                                block_size=2**20):
+    """Assumes values and weights equal-length sequences of numbers
+       >= 0 (weights may be floats), capacity a number >= 0
+       Splits the items in two halves and lists the subsets of each.
+       The second half's subsets are sorted by weight, with a running
+       maximum of value, so the best partner of a subset of the first
+       half is found by binary search for the remaining capacity.
+       Memory use is O(2**(n/2)) instead of O(n * 2**n).
+       Returns a tuple of the best total value and a sorted list of the
+       indices of the items taken"""
+    n = len(values)
+    half = n // 2
+    vals_a, wts_a, masks_a = half_sums(values[:half], weights[:half])
+    vals_b, wts_b, masks_b = half_sums(values[half:], weights[half:])
+    order = np.argsort(wts_b, kind='stable')
+    wts_b = wts_b[order]
+    # best_b[i] is the best value among the i+1 lightest subsets
+    best_b = np.maximum.accumulate(vals_b[order])
+    best_at = np.arange(len(order))
+    best_at = np.maximum.accumulate(np.where(best_b == vals_b[order],
+                                             best_at, 0))
+    best_val, best_mask = -1.0, 0
+    for start in range(0, len(vals_a), block_size):
+        stop = min(start + block_size, len(vals_a))
+        room = capacity - wts_a[start:stop]
+        partner = np.searchsorted(wts_b, room, side='right') - 1
+        totals = np.where(partner >= 0,
+                          vals_a[start:stop] + best_b[partner], -1.0)
+        i = int(np.argmax(totals))
+        if totals[i] > best_val:
+            best_val = totals[i]
+            best_mask = int(masks_a[start + i])\
+                        | int(masks_b[order[best_at[partner[i]]]]) << half
+    return float(best_val), mask_to_indices(best_mask)
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Array-based random walks
+Used by ICPP Chapter 14 to simulate many drunks without Location objects
+@author: Daniel J. Vera, Ph.D.
+"""
+import concurrent.futures
+import random
+import numpy as np
+
+class StepDistribution(object):
+    """The steps a drunk can take and the probability of each"""
+
+    def __init__(self, choices, probs=None):
+        """Assumes choices a sequence of (x, y) steps, probs None (all
+           steps equally likely) or a sequence of the same length of
+           non-negative numbers, which are normalized to sum to 1"""
+        self.choices = tuple(choices)
+        steps = np.array(self.choices)
+        self.dx, self.dy = steps[:, 0], steps[:, 1]
+        self.uniform = probs is None
+        if self.uniform:
+            probs = [1.0] * len(self.choices)
+        probs = np.array(probs, dtype=float)
+        self.probs = probs / probs.sum()
+        self.cum_probs = list(np.cumsum(self.probs))
+        self.build_alias_table()
+
+    def build_alias_table(self):
+        """Vose's alias method: draw i uniformly, then keep i with
+           probability accept[i], otherwise take alias[i]"""
+        k = len(self.probs)
+        scaled = self.probs * k
+        self.accept = np.ones(k)
+        self.alias = np.arange(k)
+        small = [i for i in range(k) if scaled[i] < 1.0]
+        large = [i for i in range(k) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.accept[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+    def draw_one(self):
+        """Returns one (x, y) step drawn with the random module"""
+        if self.uniform: # same draws as random.choice(choices)
+            return random.choice(self.choices)
+        return random.choices(self.choices, cum_weights=self.cum_probs)[0]
+
+    def sample_indices(self, shape, rng):
+        """Assumes rng a NumPy Generator
+           Returns an int array of the given shape of indices into
+           choices, drawn with the alias method"""
+        indices = rng.integers(0, len(self.choices), shape)
+        if self.uniform:
+            return indices
+        keep = rng.random(shape) < self.accept[indices]
+        return np.where(keep, indices, self.alias[indices])
+
+    def sample(self, shape, rng):
+        """Returns arrays of the x and y parts of steps drawn in the
+           given shape"""
+        indices = self.sample_indices(shape, rng)
+        return self.dx[indices], self.dy[indices]
+
+
+def as_distribution(steps):
+    """Returns steps if it is a StepDistribution, otherwise a
+       StepDistribution of the equally likely steps in steps"""
+    if isinstance(steps, StepDistribution):
+        return steps
+    return StepDistribution(steps)
+
+def final_locations(steps, num_steps, num_trials, rng,
+                    max_draws=2**22):
+    """Assumes steps a StepDistribution or a sequence of equally likely
+       (x, y) steps,
+       num_steps an int >= 0, num_trials an int > 0, rng a NumPy
+       Generator
+       Walks num_trials drunks from the origin, drawing at most
+       max_draws steps at a time, so memory use does not grow with
+       num_steps.
+       Returns arrays of the final x and y coordinates of each walk"""
+    steps = as_distribution(steps)
+    x = np.zeros(num_trials, dtype=steps.dx.dtype)
+    y = np.zeros(num_trials, dtype=steps.dy.dtype)
+    per_block = max(1, max_draws // num_trials)
+    taken = 0
+    while taken < num_steps:
+        block = min(per_block, num_steps - taken)
+        dx, dy = steps.sample((num_trials, block), rng)
+        x += dx.sum(axis=1)
+        y += dy.sum(axis=1)
+        taken += block
+    return x, y
+
+def final_distances(steps, num_steps, num_trials, rng):
+    """Returns an array of the distance from the origin at the end of
+       each of num_trials walks of num_steps steps"""
+    x, y = final_locations(steps, num_steps, num_trials, rng)
+    return np.hypot(x, y)
+
+def walk_traces(steps, num_steps, num_trials, rng):
+    """Returns (num_trials, num_steps) arrays of the x and y coordinates
+       of each walk after each step, as cumulative sums of the steps"""
+    dx, dy = as_distribution(steps).sample((num_trials, num_steps), rng)
+    return dx.cumsum(axis=1), dy.cumsum(axis=1)
+
+def trace_walk_arrays(steps, num_steps, rng, stride=1, filename=None,
+                      chunk_size=2**20):
+    """Assumes steps a StepDistribution or a sequence of equally likely
+       (x, y) steps, num_steps and stride ints > 0, rng a NumPy
+       Generator, filename None or a str ending in .npy
+       Walks one drunk from the origin, chunk_size steps at a time, and
+       records its location after every stride-th step in a
+       preallocated (num_steps // stride, 2) array: int32 if every step
+       is a whole number, otherwise float32. If filename is given, the
+       array is a memory map of that file, so only one chunk of the
+       walk is ever in memory.
+       Returns the array of recorded x, y locations"""
+    steps = as_distribution(steps)
+    whole = np.all(steps.dx == np.round(steps.dx))\
+            and np.all(steps.dy == np.round(steps.dy))
+    dtype = np.int32 if whole else np.float32
+    shape = (num_steps // stride, 2)
+    if filename is None:
+        trace = np.empty(shape, dtype=dtype)
+    else:
+        trace = np.lib.format.open_memmap(filename, mode='w+',
+                                          dtype=dtype, shape=shape)
+    chunk_size = max(stride, chunk_size - chunk_size % stride)
+    x, y = 0, 0
+    for start in range(0, shape[0] * stride, chunk_size):
+        stop = min(start + chunk_size, shape[0] * stride)
+        dx, dy = steps.sample(stop - start, rng)
+        xs, ys = x + dx.cumsum(), y + dy.cumsum()
+        rows = slice(start // stride, stop // stride)
+        trace[rows, 0] = xs[stride - 1::stride]
+        trace[rows, 1] = ys[stride - 1::stride]
+        x, y = xs[-1], ys[-1]
+    if filename is not None:
+        trace.flush()
+    return trace
+
+def checkpoint_distances(steps, walk_lengths, num_trials, rng,
+                         max_draws=2**22):
+    """Assumes walk_lengths a sequence of ints >= 0
+       Walks each of num_trials drunks once, to max(walk_lengths) steps,
+       noting the distance from the origin as it passes each length in
+       walk_lengths, so a long walk also gives every shorter one.
+       Returns a (len(walk_lengths), num_trials) array of distances"""
+    steps = as_distribution(steps)
+    checkpoints = sorted(set(walk_lengths))
+    at_checkpoint = {}
+    x = np.zeros(num_trials, dtype=steps.dx.dtype)
+    y = np.zeros(num_trials, dtype=steps.dy.dtype)
+    per_block = max(1, max_draws // num_trials)
+    taken = 0
+    for checkpoint in checkpoints:
+        while taken < checkpoint:
+            block = min(per_block, checkpoint - taken)
+            dx, dy = steps.sample((num_trials, block), rng)
+            x += dx.sum(axis=1)
+            y += dy.sum(axis=1)
+            taken += block
+        at_checkpoint[checkpoint] = np.hypot(x, y)
+    return np.array([at_checkpoint[n] for n in walk_lengths])
+
+def _sweep_shard(args):
+    steps, walk_lengths, num_trials, seed_seq = args
+    distances = checkpoint_distances(steps, walk_lengths, num_trials,
+                                     np.random.default_rng(seed_seq))
+    return distances.sum(axis=1)
+
+def sweep_mean_distances(step_dists, walk_lengths, num_trials, seed=None,
+                         num_workers=None, trials_per_shard=None):
+    """Assumes step_dists a list of StepDistributions (one per kind of
+       drunk), walk_lengths a sequence of ints >= 0, num_trials an
+       int > 0, num_workers None (one per core) or an int > 0
+       Splits the trials for each kind of drunk into shards of at most
+       trials_per_shard, each with its own child of SeedSequence(seed),
+       and runs the shards in a process pool. By default each kind gets
+       16 shards (fewer if num_trials < 16), enough to keep many cores
+       busy. The shards do not depend on num_workers, so neither do the
+       results.
+       Returns a (len(step_dists), len(walk_lengths)) array of the mean
+       distance from the origin"""
+    if trials_per_shard is None:
+        trials_per_shard = -(-num_trials // 16)
+    shards = [min(trials_per_shard, num_trials - start)
+              for start in range(0, num_trials, trials_per_shard)]
+    children = np.random.SeedSequence(seed).spawn(len(step_dists)
+                                                  * len(shards))
+    tasks = []
+    for kind in range(len(step_dists)):
+        for shard in range(len(shards)):
+            tasks.append((step_dists[kind], walk_lengths, shards[shard],
+                          children[kind * len(shards) + shard]))
+    if num_workers == 1:
+        sums = list(map(_sweep_shard, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as pool:
+            sums = list(pool.map(_sweep_shard, tasks))
+    sums = np.array(sums).reshape(len(step_dists), len(shards),
+                                  len(walk_lengths))
+    return sums.sum(axis=1) / num_trials
+
+
+class WormholeGrid(object):
+    """Dense lookup table of the wormholes of an oddField, covering
+       x in [-x_range, x_range] and y in [-y_range, y_range]"""
+
+    def __init__(self, wormholes, x_range, y_range):
+        """Assumes wormholes a dict mapping (x, y) tuples of ints to
+           Locations, as in oddField"""
+        self.x_range, self.y_range = x_range, y_range
+        shape = (2*x_range + 1, 2*y_range + 1)
+        self.has_hole = np.zeros(shape, dtype=bool)
+        self.dest_x = np.zeros(shape)
+        self.dest_y = np.zeros(shape)
+        for (x, y), loc in wormholes.items():
+            self.has_hole[x + x_range, y + y_range] = True
+            self.dest_x[x + x_range, y + y_range] = loc.get_x()
+            self.dest_y[x + x_range, y + y_range] = loc.get_y()
+
+    def cells(self, x, y):
+        """Assumes x and y equal-shape arrays of coordinates
+           Returns a boolean array saying which points are wormholes and
+           the grid indices of the points (0 where off the grid)"""
+        on_grid = (x == np.floor(x)) & (y == np.floor(y))\
+                  & (np.abs(x) <= self.x_range) & (np.abs(y) <= self.y_range)
+        i = np.where(on_grid, x + self.x_range, 0).astype(np.int64)
+        j = np.where(on_grid, y + self.y_range, 0).astype(np.int64)
+        return on_grid & self.has_hole[i, j], i, j
+
+
+def odd_walk_traces(steps, num_steps, num_trials, grid, rng,
+                    chunk_size=None):
+    """Assumes steps a StepDistribution or a sequence of equally likely
+       (x, y) steps,
+       grid a WormholeGrid, rng a NumPy Generator
+       Walks num_trials drunks in lockstep from the origin, chunk_size
+       steps at a time. Within a chunk the positions are cumulative
+       sums; each drunk's first wormhole in the chunk is found with an
+       array lookup and its later positions shifted by the jump, until
+       no unvisited wormholes remain. As in oddField, a drunk arriving
+       through a wormhole is not moved again until its next step.
+       Each wormhole found rescans the rest of its chunk, so chunks must
+       not be too long either. chunk_size None means about 4096 steps
+       for a single drunk, fewer for many (about 4096 positions per
+       chunk in all, but at least 256 steps).
+       Returns (num_trials, num_steps) arrays of the x and y coordinates
+       after each step"""
+    steps = as_distribution(steps)
+    if chunk_size is None:
+        chunk_size = max(256, 4096 // num_trials)
+    trace_x = np.empty((num_trials, num_steps))
+    trace_y = np.empty((num_trials, num_steps))
+    x, y = np.zeros(num_trials), np.zeros(num_trials)
+    for start in range(0, num_steps, chunk_size):
+        stop = min(start + chunk_size, num_steps)
+        dx, dy = steps.sample((num_trials, stop - start), rng)
+        px = x[:, None] + dx.cumsum(axis=1)
+        py = y[:, None] + dy.cumsum(axis=1)
+        cols = np.arange(stop - start)[None, :]
+        checked = np.zeros(num_trials, dtype=np.int64)
+        while True:
+            holes, i, j = grid.cells(px, py)
+            holes &= cols >= checked[:, None]
+            rows = np.nonzero(holes.any(axis=1))[0]
+            if len(rows) == 0:
+                break
+            first = np.argmax(holes[rows], axis=1)
+            hole_i, hole_j = i[rows, first], j[rows, first]
+            shift_x = grid.dest_x[hole_i, hole_j] - px[rows, first]
+            shift_y = grid.dest_y[hole_i, hole_j] - py[rows, first]
+            after = cols >= first[:, None]
+            px[rows] += shift_x[:, None] * after
+            py[rows] += shift_y[:, None] * after
+            checked[rows] = first + 1
+        trace_x[:, start:stop], trace_y[:, start:stop] = px, py
+        x, y = px[:, -1], py[:, -1]
+    return trace_x, trace_y